@@ -0,0 +1,87 @@
+
+# decode a long recording in parallel, CPython only
+#
+# the file (raw or wav, afsk.ingress.open_samples) is cut into chunks of
+# chunk_seconds decoded by a pool of processes, each worker maps the file
+# and decodes its chunk starting overlap_seconds early, so the filters and
+# the bit clock have settled and a frame that started in the previous chunk
+# is complete. the decoders run on blocks aligned on the whole file, a frame
+# completed in the overlap by a worker is completed in the same block by the
+# previous chunk, each chunk only keeps the frames completed in its own
+# range so every frame is output once, at its position in the file
+#
+#   for f in iter_frames_chunked('12h.raw', rate = 22050, jobs = 8):
+#       print(f.start, f.end, f.aprs)
+
+import os
+from multiprocessing import Pool
+
+from afsk.decoder import AFSKDecoder
+from afsk.decoder import DecodedFrame
+from afsk.decoder import iter_frames
+from afsk.fir_options import fir_profiles
+from afsk.ingress import open_samples
+from ax25.ax25 import AX25
+
+def chunk_worker(task):
+    # decode samples [lo, hi) of the file, keep the frames completed after start
+    path,lo,start,hi,kw = task
+    src,_,_ = open_samples(path, kw['stream_type'])
+    frames = []
+    for f in iter_frames(src[lo:hi], **kw):
+        consumed = lo + f.consumed
+        if consumed > start:
+            # ax25 objects don't pickle, send the frames
+            frames.append((consumed, f.ax25.frame, f.fixed, lo + f.start, lo + f.end))
+    return frames
+
+# yields DecodedFrame in file order, positions in the whole file
+# rate None, from the wav header (or 22050 for raw files)
+# other keyword arguments go to iter_frames/AFSKDecoder
+def iter_frames_chunked(path,
+                        rate            = None,
+                        jobs            = None,  # processes, default one per core
+                        chunk_seconds   = 600,
+                        overlap_seconds = 4,     # longer than the longest frame + filters warm up
+                        profile         = 'default',
+                        options         = None,
+                        stream_type     = 's16',
+                        chunk_size      = 1024,
+                        **kwargs):
+    src,wav_rate,_ = open_samples(path, stream_type)
+    if wav_rate:
+        rate = wav_rate
+        stream_type = 's16'
+    rate = rate or 22050
+    if not hasattr(src, '__len__'):
+        raise Exception('chunked decoding needs a mmap\'d file (CPython, little endian)')
+    nsamples = len(src)
+    del src
+
+    # whole blocks, block boundaries are the same in every chunk
+    step = max(1, int(chunk_seconds*rate)//chunk_size)*chunk_size
+    overlap = (int(overlap_seconds*rate) + chunk_size-1)//chunk_size*chunk_size
+    kw = dict(kwargs,
+              rate        = rate,
+              profile     = profile,
+              options     = options,
+              stream_type = stream_type,
+              chunk_size  = chunk_size)
+    tasks = [(path, max(0, start-overlap), start, min(start+step, nsamples), kw)
+             for start in range(0, nsamples, step)]
+
+    # design (and memoize) the filters here once, workers designing
+    # them would race writing lib/memoizedat.py
+    AFSKDecoder(sampling_rate = rate,
+                options       = dict(fir_profiles[profile], **(options or {})),
+                **{k:v for k,v in kwargs.items() if k in ('is_hf', 'backend', 'dsp_rate', 'filter_engine')})
+
+    with Pool(jobs or os.cpu_count()) as pool:
+        # in order, at most a chunk of frames waits for the slower workers
+        for frames in pool.imap(chunk_worker, tasks):
+            for consumed,frame,fixed,start,end in frames:
+                ax25 = AX25(frame = frame, fcs_ok = True)
+                ax25.fixed = fixed
+                ax25.start = start
+                ax25.end = end
+                yield DecodedFrame(ax25, consumed, profile)
@@ -0,0 +1,286 @@
+
+# synchronous afsk decoder, samples in, ax25 frames out
+#
+# AFSKDemodulator -> bits_q -> AX25FromAFSK run as tasks exchanging queue
+# items, the decoder runs the dsp chain, nrzi decoding, flag detection and
+# frame assembly (and fixing) back to back on each block of samples, no
+# queues or tasks in between, callable without an event loop. not faster:
+# the bits cross the queue packed, one item per block, and the filters take
+# the time (bench.decoder)
+#
+#   decoder = AFSKDecoder(sampling_rate = 22050)
+#   for ax25 in decoder.decode(arr):
+#       print(ax25)
+#
+# the stages are the ones of AFSKDemodulator (demod) and AX25FromAFSK
+# (deframe), the async classes are thin queue wrappers around the same code
+#
+# offline, no event loop, decode_samples() decodes a buffer of samples and
+# iter_frames() yields the frames of any size source (file, blocks) as they
+# are found, one block in memory at a time:
+#
+#   for f in iter_frames(open('long.raw', 'rb'), rate = 22050):
+#       print(f.start, f.end, f.aprs)
+#
+# stats_every instruments the demodulator and deframer stages (lib.stats),
+# run() dumps the stats every stats_secs to stderr or as json lines to stats_file
+# live sources are accounted (afsk.ingress.create_source_monitor), gaps in the
+# samples and the demodulator falling behind are reported on stderr
+
+import sys
+import time
+import asyncio
+from array import array
+from json import dumps
+
+from lib.utils import eprint
+from lib.stats import format_stats
+from lib.compat import Queue
+from lib.compat import IS_UPY
+from lib.compat import print_exc
+from lib.compat import array_bytes
+from lib.compat import ticks_ms
+from lib.compat import ticks_us
+from lib.compat import ticks_diff
+
+from afsk.demod import AFSKDemodulator
+from afsk.demod import create_stream_reader
+from afsk.ingress import create_source_monitor
+from afsk.fir_options import fir_profiles
+from ax25.from_afsk import AX25FromAFSK
+
+class AFSKDecoder():
+    def __init__(self, sampling_rate = 11_025,
+                       is_hf         = False,
+                       options       = {},
+                       backend       = 'python',
+                       dsp_rate      = None,
+                       filter_engine = 'auto',
+                       soft_bits     = False,
+                       chunk_size    = 1024,   # samples per read in run(), bits per chunk
+                       fix_budget_ms = 100,
+                       stats_every   = 0,      # time the stages of one block in stats_every, 0 off
+                       stats_secs    = 10,     # run(), dump the stats every stats_secs
+                       stats_file    = None,   # append them as json lines instead of stderr
+                       verbose       = False):
+        self.demod = AFSKDemodulator(in_rx         = None,
+                                     bits_out_q    = None,
+                                     sampling_rate = sampling_rate,
+                                     is_hf         = is_hf,
+                                     options       = options,
+                                     backend       = backend,
+                                     chunk_size    = chunk_size,
+                                     dsp_rate      = dsp_rate,
+                                     filter_engine = filter_engine,
+                                     soft_bits     = soft_bits,
+                                     stats_every   = stats_every)
+        self.deframer = AX25FromAFSK(bits_in_q     = None,
+                                     ax25_q        = None,
+                                     fix_budget_ms = fix_budget_ms,
+                                     stats_every   = stats_every,
+                                     verbose       = verbose)
+        self.fix_stats = self.deframer.fix_stats
+        self.chunk_size = chunk_size
+        self.stats_secs = stats_secs
+        self.stats_file = stats_file
+        self.stats_t = ticks_ms()
+        self.source = None # run() live, the source accounting (create_source_monitor)
+
+    # write the demodulator, deframer and fixer stats, stderr or stats_file
+    def dump_stats(self):
+        self.stats_t = ticks_ms()
+        demod,deframe = self.demod.stats,self.deframer.stats
+        if demod is None:
+            return
+        if self.stats_file:
+            with open(self.stats_file, 'a') as f:
+                f.write(dumps({'time'    : time.time(),
+                               'demod'   : demod,
+                               'deframe' : deframe,
+                               'fix'     : self.fix_stats,
+                               'source'  : self.source}) + '\n')
+            return
+        for line in format_stats('# STAT demod  ', demod) + format_stats('# STAT deframe', deframe):
+            eprint(line)
+        eprint('# STAT fix {}'.format(self.fix_stats))
+        if self.source:
+            eprint('# STAT source {}'.format(', '.join('{} {}'.format(k, round(v, 3)) for k,v in self.source.items())))
+
+    # decode a block of samples (array, list or np.ndarray), u16 samples
+    # with bias 32768. returns the frames completed within the block, state
+    # is carried so consecutive blocks decode as one stream
+    def decode(self, arr, siz = None, bias = 0):
+        if siz is None:
+            siz = len(arr)
+        deframe = self.deframer.deframe
+        frames = []
+        for item in self.demod.demod(arr, siz, bias):
+            frames.extend(deframe(*item))
+        return frames
+
+    # decode a stream (file, StreamReader, ...), a Queue of arrays (array,
+    # size), None ending the stream, or a buffer of samples (eg. afsk.ingress.open_samples mmap'd
+    # memoryview) until eof, the frames go to ax25_q
+    # live, in_rx delivers samples as they are sampled (stdin, rtl_fm), the
+    # frames get the wall clock time of their closing flag (ax25.time) and
+    # the source is accounted (self.source)
+    async def run(self, in_rx, ax25_q, stream_type = 's16', live = False):
+        try:
+            bias = 0 if stream_type=='s16' else 32768
+            consumed = 0
+            rate = self.demod.in_fs
+            monitor = None
+            if live:
+                self.source = {}
+                monitor = create_source_monitor(rate, status = self.source)
+            def decode(arr, siz, t):
+                # t the ticks_us() the block was asked for
+                t1 = ticks_us()
+                frames = self.decode(arr, siz, bias)
+                if monitor:
+                    monitor(siz, ticks_diff(t1, t)/1e6, ticks_diff(ticks_us(), t1)/1e6)
+                return frames
+            async def output(frames):
+                if self.demod.stats is not None and ticks_diff(ticks_ms(), self.stats_t) >= self.stats_secs*1000:
+                    self.dump_stats()
+                now = time.time()
+                for ax25 in frames:
+                    if live and ax25.end is not None:
+                        # the last sample of the block was sampled just now
+                        ax25.time = now - (consumed - ax25.end)/rate
+                    await ax25_q.put(ax25)
+            if isinstance(in_rx, Queue):
+                while True:
+                    t = ticks_us()
+                    arr_siz = await in_rx.get()
+                    if arr_siz is None:
+                        in_rx.task_done()
+                        break
+                    if isinstance(arr_siz, tuple) and len(arr_siz)==2:
+                        arr,siz = arr_siz
+                    else:
+                        arr = arr_siz
+                        siz = len(arr)
+                    consumed += siz
+                    await output(decode(arr, siz, t))
+                    in_rx.task_done()
+            elif not (hasattr(in_rx, 'readinto') or hasattr(in_rx, 'read')):
+                for i in range(0, len(in_rx), self.chunk_size):
+                    blk = in_rx[i:i+self.chunk_size]
+                    consumed += len(blk)
+                    await output(self.decode(blk, len(blk), bias))
+                    await asyncio.sleep(0)
+            else:
+                arr = array('h' if stream_type=='s16' else 'H', (0 for x in range(self.chunk_size)))
+                read_block = create_stream_reader(in_rx, arr)
+                while True:
+                    t = ticks_us()
+                    siz = await read_block()
+                    if not siz:
+                        break
+                    consumed += siz
+                    await output(decode(arr, siz, t))
+                    await asyncio.sleep(0)
+            self.dump_stats()
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            print_exc(err)
+
+class DecodedFrame():
+    # a frame from decode_samples/iter_frames
+    def __init__(self, ax25, consumed, profile):
+        self.ax25     = ax25
+        self.start    = ax25.start # input sample position of the opening flag
+        self.end      = ax25.end   # and of the closing flag
+        self.consumed = consumed   # input samples consumed when the frame was completed
+        self.profile  = profile    # fir_profiles name of the decoder
+        self.fixed    = ax25.fixed # bits flipped by the fixer, 0 if the fcs was good
+
+    @property
+    def aprs(self):
+        return self.ax25.to_aprs()
+
+    def __repr__(self):
+        return repr(self.ax25)
+
+# blocks (array, size) of at most chunk_size samples from
+#   a file or stream with readinto/read, s16 or u16 little endian
+#   bytes, bytearray or byte memoryview of little endian samples
+#   an array, list, np.ndarray or memoryview ('h', 'H') of samples
+#   any other iterable of blocks (arrays, bytes or (array, size) tuples)
+def iter_sample_blocks(source, chunk_size = 1024, stream_type = 's16'):
+    typecode = 'h' if stream_type=='s16' else 'H'
+    if hasattr(source, 'readinto') or hasattr(source, 'read'):
+        arr = array(typecode, (0 for x in range(chunk_size)))
+        buf = array_bytes(arr, 2)
+        readinto = getattr(source, 'readinto', None)
+        swap = not IS_UPY and sys.byteorder == 'big'
+        off = 0
+        while True:
+            if readinto:
+                n = readinto(buf[off:])
+            else:
+                b = source.read(len(buf)-off)
+                n = len(b) if b else 0
+                buf[off:off+n] = b
+            if not n:
+                return
+            n += off
+            siz = n//2
+            off = n%2
+            tail = buf[n-1] if off else 0
+            if swap:
+                arr.byteswap()
+            if siz:
+                yield arr, siz
+            if off:
+                buf[0] = tail
+    elif isinstance(source, (bytes, bytearray)) or\
+         isinstance(source, memoryview) and getattr(source, 'format', 'B') == 'B':
+        n = len(source)//2 # an odd last byte is dropped
+        for i in range(0, n, chunk_size):
+            blk = array(typecode, bytes(source[2*i:2*min(i+chunk_size, n)]))
+            yield blk, len(blk)
+    elif hasattr(source, '__getitem__') and hasattr(source, '__len__'):
+        for i in range(0, len(source), chunk_size):
+            blk = source[i:i+chunk_size]
+            yield blk, len(blk)
+    else:
+        for blk in source:
+            if isinstance(blk, tuple):
+                yield blk
+            elif isinstance(blk, (bytes, bytearray, memoryview)):
+                blk = array(typecode, bytes(blk))
+                yield blk, len(blk)
+            else:
+                yield blk, len(blk)
+
+# yields DecodedFrame as they are found in source (see iter_sample_blocks)
+# profile names the fir_profiles option set, options override some of them,
+# other keyword arguments go to AFSKDecoder (backend, soft_bits, dsp_rate, ...)
+def iter_frames(source,
+                rate        = 22050,
+                profile     = 'default',
+                options     = None,
+                stream_type = 's16',
+                chunk_size  = 1024,
+                **kwargs):
+    decoder = AFSKDecoder(sampling_rate = rate,
+                          options       = dict(fir_profiles[profile], **(options or {})),
+                          chunk_size    = chunk_size,
+                          **kwargs)
+    bias = 0 if stream_type=='s16' else 32768
+    consumed = 0
+    for arr,siz in iter_sample_blocks(source, chunk_size, stream_type):
+        consumed += siz
+        for ax25 in decoder.decode(arr, siz, bias):
+            yield DecodedFrame(ax25, consumed, profile)
+
+# decode a whole buffer of samples, returns the list of DecodedFrame
+def decode_samples(buf,
+                   rate    = 22050,
+                   profile = 'default',
+                   options = None,
+                   **kwargs):
+    return list(iter_frames(buf, rate = rate, profile = profile, options = options, **kwargs))
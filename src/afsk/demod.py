@@ -1,28 +1,55 @@
 
 import sys
-import struct
 import asyncio
 from array import array
-import math
 import lib.upydash as _
 from asyncio import Event
 
 from lib.utils import eprint
 from lib.memoize import memoize_loads
 from lib.memoize import memoize_dumps
+from lib.memoize import memoize_args
 from lib.compat import Queue
 from lib.compat import IS_UPY
+from lib.compat import ticks_us
+from lib.stats import new_stages
+from lib.stats import stage_add
 
 from afsk.func import create_unnrzi
+from afsk.func import soft_q
 from afsk.func import create_corr
 from afsk.func import lpf_fir_design
 from afsk.func import bandpass_fir_design
 from afsk.func import create_sampler
+from afsk.func import create_sampler_pll
 from afsk.func import create_fir
+from afsk.func import create_fir_sym
+from afsk.func import is_symmetric
 from afsk.func import create_power_meter
-from afsk.func import clamps16
+from afsk.func import resample_ratio
+from afsk.func import create_resampler
+from afsk.func import create_gate
+from afsk.func import create_squelch
+from afsk.func import create_activity_detector
 from afsk.fir_options import fir_options
-from afsk.func import bu16toi, bs16toi
+
+from lib.compat import array_bytes
+
+# absolute sample positions, 32 bit on micropython
+_POS_TYPE = 'l' if IS_UPY else 'q'
+
+# instrumented stages, see lib.stats
+STAGES = ('resampler', 'gate', 'bpf', 'pwrmtr', 'corr', 'lpf', 'sampler', 'unnrzi')
+
+# the rate to run the filters at for input at rate, None if the filters are
+# memoized at rate (lib/memoizedat.py), else the highest memoized rate below
+# it (the lowest if none is). designing filters at other rates needs scipy
+def memoized_dsp_rate(rate):
+    rates = sorted(set(a[2] for a in memoize_args('bpf')))
+    if not rates or rate in rates:
+        return None
+    below = [r for r in rates if r <= rate]
+    return below[-1] if below else rates[0]
 
 from lib.compat import print_exc
 
@@ -36,6 +63,12 @@ class AFSKDemodulator():
                        stream_type   = 's16', # if in_rx is a stream, u16 or s16?
                        is_embedded   = False,
                        options       = {},
+                       backend       = 'python', # 'python' | 'numpy', numpy processes blocks of samples
+                       chunk_size    = 1024,     # if in_rx is a stream, samples per read
+                       dsp_rate      = None,     # resample the input to this rate before the dsp chain
+                       filter_engine = 'auto',   # numpy backend, 'direct' | 'fft' overlap-save | 'auto' per block size
+                       soft_bits     = False,    # also output a confidence (0-255) per bit, (bits, nbits, confs) chunks
+                       stats_every   = 0,        # instrumentation, time the stages of one block in stats_every, 0 off
                        ):
                        # debug_samples = False, # output intermediate samples to stderr
 
@@ -44,6 +77,7 @@ class AFSKDemodulator():
         self.verbose = verbose
         self.stream_type = stream_type
         self.is_embedded = is_embedded
+        self.backend = backend
         # self.debug_samples = debug_samples
         self.stream_done = Event()
         self.is_hf = is_hf
@@ -63,8 +97,22 @@ class AFSKDemodulator():
             self.tbaud  = 1.0/self.fbaud
             self.corr_delay = 446e-6
 
-        self.fs = sampling_rate
+        # input at sampling_rate, the filters run at dsp_rate, eg. 48000 -> 11025
+        self.in_fs = sampling_rate
+        self.fs = dsp_rate or sampling_rate
         self.ts = 1/self.fs
+        self.resampler = None
+        self.pos_up,self.pos_down,self.pos_rdelay = 1,1,0
+        if self.fs != self.in_fs:
+            up,down = resample_ratio(self.in_fs, self.fs)
+            if backend == 'numpy':
+                from afsk.func_np import create_resampler_np
+                self.resampler,rdelay = create_resampler_np(up, down)
+            else:
+                self.resampler,rdelay = create_resampler(up, down)
+            # dsp sample k is input sample (k*down - rdelay)/up, rdelay the
+            # resampler group delay in up sampled samples
+            self.pos_up,self.pos_down,self.pos_rdelay = up,down,rdelay
         
         do_memoize = True
         options = dict(fir_options,  **options)
@@ -96,10 +144,7 @@ class AFSKDemodulator():
                                         bandpass_width, 
                                         bandpass_amark, 
                                         bandpass_aspace)
-        self.bpf = create_fir(coefs = coefs, scale = g)
-        
-        self.corr = create_corr(ts    = self.ts,
-                                corr_delay = self.corr_delay)
+        bpf_coefs,bpf_g = coefs,g
 
         # nmark = int(self.tmark/self.ts)
         lpf_ncoefsbaud = options['lpf_ncoefsbaud']
@@ -128,24 +173,171 @@ class AFSKDemodulator():
                                             lpf_ncoefs, 
                                             lpf_width, 
                                             lpf_aboost)
-        self.lpf = create_fir(coefs = coefs, scale = g)
-
-        self.sampler = create_sampler(fbaud = self.fbaud,
-                                      fs    = self.fs)
-        self.unnrzi = create_unnrzi()
-
-        self.pwrmtr = create_power_meter(siz = 20)#nmark*2)
+        lpf_coefs,lpf_g = coefs,g
+
+        fold = options['fir_fold']
+        # 'zc' bits from zero crossing gaps | 'pll' clock recovery
+        sampler = options['sampler']
+        if sampler not in ('zc', 'pll'):
+            raise Exception('unknown sampler {}'.format(sampler))
+        self.lock = array('i', (0,)) # 1 while the pll sampler is locked
+        # soft bits, sampler confidence of the last raw bit and of the one before,
+        # a raw bit error flips two decoded bits (nrzi) so each decoded bit gets
+        # the lowest confidence of the two raw bits it came from
+        self.soft = soft_bits
+        self.conf = array('i', (0,0)) if soft_bits else None
+        self.conf_prev = 0
+        if filter_engine not in ('auto', 'direct', 'fft'):
+            raise Exception('unknown filter engine {}'.format(filter_engine))
+        if filter_engine == 'fft' and backend != 'numpy':
+            raise Exception('fft filter engine requires the numpy backend')
+        if filter_engine == 'fft' and not fold:
+            # unfolded filters floor each tap (create_fir), the fft sums first
+            raise Exception('fft filter engine requires folded filters (fir_fold)')
+        if self.backend == 'numpy':
+            # block processing, same results as the sample-by-sample closures
+            from afsk.func_np import create_fir_np
+            from afsk.func_np import create_fir_sym_np
+            from afsk.func_np import create_fir_fft_np
+            from afsk.func_np import create_corr_np
+            from afsk.func_np import create_sampler_np
+            from afsk.func_np import create_sampler_pll_np
+            from afsk.func_np import create_unnrzi_np
+            from afsk.func_np import create_power_meter_np
+            def fir(coefs, scale):
+                # firls designs are symmetric, scaled once kernels where possible
+                if not (fold and is_symmetric(coefs)):
+                    return create_fir_np(coefs = coefs, scale = scale)
+                if filter_engine == 'direct':
+                    return create_fir_sym_np(coefs = coefs, scale = scale)
+                return create_fir_fft_np(coefs = coefs, scale = scale,
+                                         auto  = filter_engine == 'auto')
+            self.bpf = fir(coefs = bpf_coefs, scale = bpf_g)
+            self.corr = create_corr_np(ts    = self.ts,
+                                       corr_delay = self.corr_delay)
+            self.lpf = fir(coefs = lpf_coefs, scale = lpf_g)
+            if sampler == 'pll':
+                self.sampler = create_sampler_pll_np(fbaud = self.fbaud,
+                                                     fs    = self.fs,
+                                                     lock  = self.lock,
+                                                     soft  = soft_bits)
+            else:
+                self.sampler = create_sampler_np(fbaud = self.fbaud,
+                                                 fs    = self.fs,
+                                                 soft  = soft_bits)
+            self.unnrzi = create_unnrzi_np()
+            self.pwrmtr = create_power_meter_np(siz = options['pwrmtr_window'],
+                                                ema = options['pwrmtr_ema'])
+        elif self.backend == 'python':
+            # firls designs are symmetric, folded kernels where possible
+            fir = create_fir_sym if fold and is_symmetric(bpf_coefs) else create_fir
+            self.bpf = fir(coefs = bpf_coefs, scale = bpf_g)
+            self.corr = create_corr(ts    = self.ts,
+                                    corr_delay = self.corr_delay)
+            fir = create_fir_sym if fold and is_symmetric(lpf_coefs) else create_fir
+            self.lpf = fir(coefs = lpf_coefs, scale = lpf_g)
+            if sampler == 'pll':
+                self.sampler = create_sampler_pll(fbaud = self.fbaud,
+                                                  fs    = self.fs,
+                                                  lock  = self.lock,
+                                                  conf  = self.conf)
+            else:
+                self.sampler = create_sampler(fbaud = self.fbaud,
+                                              fs    = self.fs,
+                                              conf  = self.conf)
+            self.unnrzi = create_unnrzi()
+            self.pwrmtr = create_power_meter(siz = options['pwrmtr_window'],
+                                             ema = options['pwrmtr_ema'])
+        else:
+            raise Exception('unknown backend {}'.format(backend))
         self.squelch = options['squelch']
 
+        # adaptive squelch (afsk.func.create_squelch), squelch_ratio times the
+        # noise floor of the power meter output, set between blocks. squelch is
+        # the current level, sql_floor the noise floor, 0 none yet or fixed squelch
+        self.sql_ratio = options['squelch_ratio']
+        self.sql_floor = 0
+        self.sql_track = None
+        if self.sql_ratio:
+            self.sql_track = create_squelch(fs      = self.fs,
+                                            squelch = options['squelch'],
+                                            ratio   = self.sql_ratio,
+                                            secs    = options['squelch_secs'])
+            det_kw = dict(fs    = self.fs,
+                          ftone = max(self.fmark, self.fspace),
+                          thr   = options['gate_thr'],
+                          level = options['gate_level'])
+            if self.backend == 'numpy':
+                from afsk.func_np import create_activity_detector_np
+                self.sql_detect = create_activity_detector_np(**det_kw)
+            else:
+                self.sql_detect = create_activity_detector(**det_kw)
+
+        # activity gate (afsk.func.create_gate), the chain only runs while there
+        # is afsk, primed with the last gate_preroll ms when it opens
+        self.gate = None
+        self.gated_samples = 0 # dsp samples skipped, pre-roll replayed later included
+        if options['gate']:
+            gate_kw = dict(fs      = self.fs,
+                           ftone   = max(self.fmark, self.fspace),
+                           preroll = options['gate_preroll'],
+                           hang    = options['gate_hang'],
+                           thr     = options['gate_thr'],
+                           level   = options['gate_level'])
+            if self.backend == 'numpy':
+                from afsk.func_np import create_gate_np
+                self.gate = create_gate_np(**gate_kw)
+            else:
+                self.gate = create_gate(**gate_kw)
+
         #how much we need to flush internal filters to process all sampled data
         self.flush_size = int((lpf_ncoefs+bandpass_ncoefs)*(self.tbaud/self.ts))
 
+        # stream input buffer, samples are read directly into this array
+        self.in_arr = array('h' if self.stream_type=='s16' else 'H', (0 for x in range(chunk_size)))
+        # recovered bits, one bit per byte, sent as (bytes, nbits, confs, pos) chunks on
+        # bits_out_q, confs None without soft_bits
+        self.bits_buf = bytearray(chunk_size)
+        self.conf_buf = bytearray(chunk_size) if soft_bits else None
+
+        # input sample position of each bit, where the sampler output it minus
+        # the group delay of the (linear phase) filters and the correlator
+        self.pos_buf = array('i', (0 for x in range(chunk_size))) # index in the block
+        self.pos_delay = (bandpass_ncoefs-1)//2 + (lpf_ncoefs-1)//2 + int(round(self.corr_delay/self.ts))//2
+        self.pos_base = 0 # dsp samples before the current block
+
+        # instrumentation (lib.stats), counters of all the blocks
+        #   blocks, samples  input blocks and samples
+        #   bits             bits output
+        #   timed            blocks run with the stages timed
+        #   dsp_samples      samples of the timed blocks (after resampling)
+        #   squelched        of which below the squelch level, skipped
+        #   gated            samples skipped by the activity gate
+        #   squelch          current squelch level
+        #   sql_floor        current noise floor, adaptive squelch
+        self.stats_every = stats_every
+        self.stats_n = 0
+        self.stats = None
+        if stats_every:
+            self.stats = {'blocks'      : 0,
+                          'samples'     : 0,
+                          'bits'        : 0,
+                          'timed'       : 0,
+                          'dsp_samples' : 0,
+                          'squelched'   : 0,
+                          'gated'       : 0,
+                          'squelch'     : self.squelch,
+                          'sql_floor'   : 0,
+                          'stages'      : new_stages(STAGES)}
+
         self.tasks = []
 
     async def __aenter__(self):
         if not self.in_rx:
             return self
-        if isinstance(self.in_rx, Queue):
+        if self.backend == 'numpy':
+            self.tasks.append(asyncio.create_task(self.np_core(in_rx = self.in_rx)))
+        elif isinstance(self.in_rx, Queue):
             self.tasks.append(asyncio.create_task(self.q_core(in_rx = self.in_rx)))
         elif hasattr(self.in_rx, 'readexactly') or hasattr(self.in_rx, 'read'):
             self.tasks.append(asyncio.create_task(self.stream_core(in_rx = self.in_rx)))
@@ -166,116 +358,31 @@ class AFSKDemodulator():
         else:
             await self.stream_done.wait()
 
-    # directly access from a stream with readexactly method
-    # @micropython.native
+    # read blocks of samples from a stream (file, StreamReader, RingIO, Stream)
+    # into a pre-allocated array and process them in place
     async def stream_core(self, in_rx):
         try:
-            # Process a chunk of samples
-            corr     = self.corr
-            lpf      = self.lpf
-            bpf      = self.bpf
-
-            sampler  = self.sampler
-            unnrzi   = self.unnrzi
-
-            pwrmtr   = self.pwrmtr
-
-            bits_q = self.bits_q   # output stream
-
-            asleep = asyncio.sleep
-
-            is_sync = False
-            readinto = None
-            read = None
-
             in_rx = in_rx or self.in_rx
-            
-            clsname = type(in_rx).__name__
-
-            # a bit tricky here, we are getting compatibilty for reading across platformats
-            # micropython and python, Stream, RingIO, and files, both sync and async interfaces...
-            if hasattr(in_rx, 'readinto') and clsname == 'RingIO':
-                bi = bytearray(2) # fixed allocation
-                readinto = in_rx.readinto
-                is_sync = True
-            if hasattr(in_rx, 'readinto') and clsname == 'Stream':
-                bi = bytearray(2) # fixed allocation
-                readinto = in_rx.readinto
-                is_sync = False
-            elif hasattr(in_rx, 'readexactly'):
-                # already a stream
-                read = in_rx.readexactly
-                is_sync = False
-            elif hasattr(in_rx, 'read'):
-                read = in_rx.read
-                is_sync = True
-            else:
-                raise Exception('unknown stream {}'.format(in_rx))
+            arr = self.in_arr
+            read_block = create_stream_reader(in_rx, arr)
 
-            sql = self.squelch
-
-            # bytes to integer converter
-            btoi = bs16toi if self.stream_type=='s16' else bu16toi
-            i = 0
+            # u16 samples are centered here, s16 are used as is
+            bias = 0 if self.stream_type=='s16' else 32768
 
             while True:
-                try:
-
-                    # read two bytes from stream
-                    if readinto:
-                        if is_sync:
-                            n = readinto(bi) # read 2 bytes into bytearray
-                        else:
-                            n = await readinto(bi)
-                        if not n:
-                            break
-                    elif read:
-                        if is_sync:
-                            bi = read(2)
-                        else:
-                            bi = await read(2)
-                        # did we read anything?
-                        if not bi:
-                            break
-
-                except EOFError:
-                    # always exit on eof
+                siz = await read_block()
+                if not siz:
                     break
-
-                # process
-                o = btoi(bi) # convert bytes to integer
-                o = bpf(o)
-                p = pwrmtr(o)
-                if p < sql:
-                    # skip if we are below squelch level
-                    continue
-                o = corr(o)
-                o = lpf(o)
-                bs = sampler(o)
-                # eprint(f'{i:10} {o:10} {o2:10} {o3:10} {bs:10}')
-                # i+=1
-                if bs != 2: # _NONE
-                    bx = unnrzi(bs)
-                    # eprint(b,end='')
-                    await bits_q.put(bx) #bits_out_q
+                await self.core(arr, siz, bias)
+                await asyncio.sleep(0)
         except Exception as err:
             print_exc(err)
         finally:
             self.stream_done.set()
             # print('STREAM DONE')
 
-
     async def q_core(self, in_rx):
         try:
-            # Process a chunk of samples
-            corr     = self.corr
-            lpf      = self.lpf
-            bpf      = self.bpf
-            sampler  = self.sampler
-            unnrzi   = self.unnrzi
-            pwrmtr   = self.pwrmtr
-
-            bits_q = self.bits_q   # output stream
             in_rx = in_rx or self.in_rx
 
             while True:
@@ -290,24 +397,373 @@ class AFSKDemodulator():
                     arr = arr_siz
                     siz = len(arr)
 
-                for i in range(siz):
-                    o = arr[i]
-                    o = bpf(o)
-                    p = pwrmtr(o)
-                    if p < sql:
-                        continue
-                    o = corr(o)
-                    o = lpf(o)
-                    bs = sampler(o)
-                    if bs != 2: # _NONE
-                        b = unnrzi(bs)
-                        # eprint(b,end='')
-                        await bits_q.put(b) #bits_out_q
+                await self.core(arr, siz)
 
                 in_rx.task_done() # done
         except Exception as err:
             print_exc(err)
 
+    # process a block of samples through the dsp chain, bits out on bits_out_q
+    async def core(self, arr, siz, bias = 0):
+        for item in self.py_demod(arr, siz, bias):
+            await self.bits_q.put(item) #bits_out_q
+
+    # input sample positions of the first n dsp sample indexes idx of the
+    # current block (array or np.ndarray)
+    def in_pos(self, idx, n):
+        base = self.pos_base - self.pos_delay
+        up,down,rdelay = self.pos_up,self.pos_down,self.pos_rdelay
+        if self.backend == 'numpy':
+            return ((base + idx[:n])*down - rdelay)//up
+        return array(_POS_TYPE, (((base + p)*down - rdelay)//up for p in idx[:n]))
+
+    # process a block of samples sample-by-sample through the dsp chain
+    # recovered bits are packed into chunks (bits, nbits, confs, pos) of at most
+    # chunk_size bits, confs None without soft_bits, returns the list of chunks
+    def py_demod(self, arr, siz, bias = 0):
+        timed = self.stats is not None and self.stats_block(siz)
+        if self.resampler:
+            t = ticks_us()
+            n = siz
+            arr,siz = self.resampler(arr, siz, bias)
+            bias = 0
+            if timed:
+                stage_add(self.stats['stages']['resampler'], 1, n, t)
+        chain = lambda arr, siz, bias: self.py_chain(arr, siz, bias, timed)
+        if self.gate:
+            return self.gated(chain, arr, siz, bias, timed)
+        return chain(arr, siz, bias)
+
+    # run the segments of the block the activity gate lets through, positions
+    # from the start of the block (replayed pre-roll before it)
+    def gated(self, chain, arr, siz, bias, timed):
+        t = ticks_us()
+        if self.backend == 'numpy':
+            segs = [(off, x, 0) for off,x in self.gate(arr)]
+        else:
+            segs = self.gate(arr, siz, bias)
+        if timed:
+            stage_add(self.stats['stages']['gate'], 1, siz, t)
+        base = self.pos_base
+        chunks = []
+        ran = 0
+        for off,x,b in segs:
+            self.pos_base = base + off
+            chunks.extend(chain(x, len(x), b))
+            ran += min(siz, off+len(x)) - max(0, off)
+        self.pos_base = base + siz
+        self.gated_samples += siz - ran
+        if self.stats is not None:
+            self.stats['gated'] += siz - ran
+        return chunks
+
+    # timed, each stage of the block is timed call by call (self.timer), the
+    # same loop with the same bits, only slower
+    # @micropython.native
+    def py_chain(self, arr, siz, bias = 0, timed = False):
+        corr     = self.corr
+        lpf      = self.lpf
+        bpf      = self.bpf
+        sampler  = self.sampler
+        unnrzi   = self.unnrzi
+        pwrmtr   = self.pwrmtr
+        if timed:
+            timer    = self.timer
+            corr     = timer('corr', corr)
+            lpf      = timer('lpf', lpf)
+            bpf      = timer('bpf', bpf)
+            sampler  = timer('sampler', sampler)
+            unnrzi   = timer('unnrzi', unnrzi)
+            pwrmtr   = timer('pwrmtr', pwrmtr)
+        sql      = self.squelch
+        chunks   = []
+        bbuf     = self.bits_buf
+        nbuf     = len(bbuf)
+        nb       = 0
+        soft     = self.soft
+        cbuf     = self.conf_buf
+        conf     = self.conf
+        pbuf     = self.pos_buf
+        psum     = 0
+        nsql     = 0
+
+        for i in range(siz):
+            o = bpf(arr[i] - bias)
+            p = pwrmtr(o)
+            psum += p
+            if p < sql:
+                # skip if we are below squelch level
+                nsql += 1
+                continue
+            o = corr(o)
+            o = lpf(o)
+            bs = sampler(o)
+            if bs != 2: # _NONE
+                bbuf[nb] = unnrzi(bs)
+                pbuf[nb] = i
+                if soft:
+                    c = conf[0]
+                    cbuf[nb] = soft_q(c if c < conf[1] else conf[1])
+                    conf[1] = c
+                nb += 1
+                if nb == nbuf:
+                    chunks.append((bytes(bbuf), nb, bytes(cbuf) if soft else None, self.in_pos(pbuf, nb)))
+                    nb = 0
+        if nb:
+            chunks.append((bytes(bbuf[:nb]), nb, bytes(cbuf[:nb]) if soft else None, self.in_pos(pbuf, nb)))
+        self.pos_base += siz
+        if self.sql_track:
+            self.adapt(arr, siz, bias, psum)
+        if self.stats is not None:
+            self.stats['bits'] += sum(c[1] for c in chunks)
+            if timed:
+                self.stats['dsp_samples'] += siz
+                self.stats['squelched'] += nsql
+        return chunks
+
+    # adaptive squelch, the power meter output of a block (psum its sum) and
+    # whether there was afsk in it, sets the squelch level of the next block
+    def adapt(self, arr, siz, bias, psum):
+        detect = self.sql_detect
+        idle = True
+        i = 0
+        while i < siz:
+            i,act = detect(arr, i, siz, bias)
+            idle = idle and not act
+        self.squelch,self.sql_floor = self.sql_track(psum, siz, idle)
+        if self.stats is not None:
+            self.stats['squelch'] = self.squelch
+            self.stats['sql_floor'] = self.sql_floor
+
+    # count a block, returns True if its stages are to be timed
+    def stats_block(self, siz):
+        stats = self.stats
+        stats['blocks'] += 1
+        stats['samples'] += siz
+        self.stats_n += 1
+        if self.stats_n < self.stats_every:
+            return False
+        self.stats_n = 0
+        stats['timed'] += 1
+        return True
+
+    # f timed on every call, added to the stage name. the time includes
+    # reading the clock, about the same for every stage
+    def timer(self, name, f):
+        stage = self.stats['stages'][name]
+        def inner(x):
+            t = ticks_us()
+            o = f(x)
+            stage_add(stage, 1, 1, t)
+            return o
+        return inner
+
+    # numpy backend, same as timer, the stage counts the block samples
+    def timer_np(self, name, f):
+        stage = self.stats['stages'][name]
+        def inner(x):
+            t = ticks_us()
+            o = f(x)
+            stage_add(stage, 1, len(x), t)
+            return o
+        return inner
+
+    # numpy backend, run the dsp chain on blocks of samples
+    # in_rx is either a Queue of arrays or a stream (file/StreamReader)
+    async def np_core(self, in_rx):
+        import numpy as np
+        try:
+            in_rx = in_rx or self.in_rx
+            is_q = isinstance(in_rx, Queue)
+            if not is_q:
+                arr = self.in_arr
+                read_block = create_stream_reader(in_rx, arr)
+                dt = np.int16 if self.stream_type=='s16' else np.uint16
+
+            while True:
+                if is_q:
+                    arr_siz = await in_rx.get()
+                    if isinstance(arr_siz, tuple) and len(arr_siz)==2:
+                        arr,siz = arr_siz
+                    else:
+                        arr = arr_siz
+                        siz = len(arr)
+                    x = np.array(arr[:siz], dtype=np.int64)
+                else:
+                    siz = await read_block()
+                    if not siz:
+                        break
+                    # view on the read buffer, converted in one go
+                    x = np.frombuffer(arr, dtype=dt, count=siz).astype(np.int64)
+                    if self.stream_type != 's16':
+                        x -= 32768
+
+                await self.np_block(x)
+
+                if is_q:
+                    in_rx.task_done()
+                else:
+                    await asyncio.sleep(0)
+        except Exception as err:
+            print_exc(err)
+        finally:
+            self.stream_done.set()
+
+    # numpy backend, one block (np.ndarray int64) through the dsp chain
+    async def np_block(self, x):
+        for item in self.np_demod(x):
+            await self.bits_q.put(item) #bits_out_q
+
+    # numpy backend, returns the recovered bits of a block as a list of
+    # chunks, same as py_demod
+    def np_demod(self, x):
+        timed = self.stats is not None and self.stats_block(len(x))
+        if self.resampler:
+            t = ticks_us()
+            n = len(x)
+            x = self.resampler(x)
+            if timed:
+                stage_add(self.stats['stages']['resampler'], 1, n, t)
+        chain = lambda x, n, b: self.np_chain(x, timed)
+        if self.gate:
+            return self.gated(chain, x, len(x), 0, timed)
+        return chain(x, len(x), 0)
+
+    def np_chain(self, x, timed = False):
+        import numpy as np
+        stats    = self.stats
+        corr     = self.corr
+        lpf      = self.lpf
+        bpf      = self.bpf
+        sampler  = self.sampler
+        unnrzi   = self.unnrzi
+        pwrmtr   = self.pwrmtr
+        if timed:
+            timer    = self.timer_np
+            corr     = timer('corr', corr)
+            lpf      = timer('lpf', lpf)
+            bpf      = timer('bpf', bpf)
+            sampler  = timer('sampler', sampler)
+            unnrzi   = timer('unnrzi', unnrzi)
+            pwrmtr   = timer('pwrmtr', pwrmtr)
+        o = bpf(x)
+        p = pwrmtr(o)
+        # drop samples below squelch level
+        keep = np.flatnonzero(p >= self.squelch)
+        o = o[keep]
+        o = corr(o)
+        o = lpf(o)
+        bs,cs,idxs = sampler(o)
+        bs = unnrzi(bs)
+        n = len(bs)
+        pos = self.in_pos(keep[idxs], n)
+        self.pos_base += len(x)
+        if self.sql_track:
+            self.adapt(x, len(x), 0, int(p.sum()))
+        if stats is not None:
+            stats['bits'] += n
+            if timed:
+                stats['dsp_samples'] += len(x)
+                stats['squelched'] += len(x) - len(keep)
+        if not n:
+            return []
+        if self.soft:
+            from afsk.func_np import soft_q_np
+            # lowest of each raw bit and the one before, as in py_chain()
+            c = np.minimum(cs, np.concatenate(((self.conf_prev,), cs[:-1])))
+            self.conf_prev = int(cs[-1])
+            return [(bs.tobytes(), n, soft_q_np(c).tobytes(), pos)]
+        return [(bs.tobytes(), n, None, pos)]
+
+    # process a block of samples with the selected backend, no queues,
+    # returns the recovered bits as a list of chunks (bits, nbits, confs, pos)
+    def demod(self, arr, siz, bias = 0):
+        if self.backend == 'numpy':
+            import numpy as np
+            x = np.array(arr[:siz], dtype=np.int64)
+            if bias:
+                x -= bias
+            return self.np_demod(x)
+        return self.py_demod(arr, siz, bias)
+
+    # process a block of samples pushed by the caller (no in_rx) with the
+    # selected backend, the bits go to bits_out_q
+    async def process(self, arr, siz, bias = 0):
+        for item in self.demod(arr, siz, bias):
+            await self.bits_q.put(item) #bits_out_q
+
+# reads blocks of 16 bit samples from a stream straight into the memory of arr,
+# no per sample conversion. returns an async function that fills arr and returns
+# the number of whole samples read (0 on eof). an odd byte at the end of a read is
+# carried over to the front of the next block.
+def create_stream_reader(in_rx, arr):
+    buf = memoryview(array_bytes(arr, 2)) # byte view on arr, zero copy
+    nbuf = len(buf)
+    tail = bytearray(1)
+    off = 0
+
+    readinto = None
+    read = None
+    clsname = type(in_rx).__name__
+
+    # a bit tricky here, we are getting compatibilty for reading across platformats
+    # micropython and python, Stream, RingIO, and files, both sync and async interfaces...
+    if hasattr(in_rx, 'readinto') and clsname == 'RingIO':
+        readinto = in_rx.readinto
+        is_sync = True
+    elif hasattr(in_rx, 'readinto') and clsname == 'Stream':
+        readinto = in_rx.readinto
+        is_sync = False
+    elif hasattr(in_rx, 'readexactly'):
+        # asyncio StreamReader, no readinto
+        read = in_rx.read
+        is_sync = False
+    elif hasattr(in_rx, 'readinto'):
+        # files
+        readinto = in_rx.readinto
+        is_sync = True
+    elif hasattr(in_rx, 'read'):
+        read = in_rx.read
+        is_sync = True
+    else:
+        raise Exception('unknown stream {}'.format(in_rx))
+
+    # samples are little endian
+    swap = not IS_UPY and sys.byteorder == 'big'
+
+    async def inner():
+        nonlocal off
+        siz = 0
+        while siz == 0:
+            if off:
+                buf[0] = tail[0]
+            try:
+                if readinto:
+                    if is_sync:
+                        n = readinto(buf[off:])
+                    else:
+                        n = await readinto(buf[off:])
+                else:
+                    if is_sync:
+                        b = read(nbuf-off)
+                    else:
+                        b = await read(nbuf-off)
+                    n = len(b) if b else 0
+                    buf[off:off+n] = b
+            except EOFError:
+                # always exit on eof
+                n = 0
+            if not n:
+                return 0
+            n += off
+            siz = n//2
+            off = n%2
+            if off:
+                tail[0] = buf[n-1]
+        if swap:
+            arr.byteswap()
+        return siz
+    return inner
 
 ##############################
 ######### OLD STUFF ##########
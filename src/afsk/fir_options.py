@@ -45,7 +45,57 @@ fir_options = {
     'lpf_f'               : 800,
     'lpf_width'           : 250,
     'lpf_aboost'          : 3,
-    'squelch'             : 100,
+    'squelch'             : 100,   # power meter level below which samples are skipped
+    'squelch_ratio'       : 0,     # adaptive squelch at this times the noise floor (squelch the lowest), 0 fixed
+    'squelch_secs'        : 5,     # noise floor, lowest level of the last seconds
+    'pwrmtr_window'       : 20,    # power meter (squelch) window, samples
+    'pwrmtr_ema'          : False, # exponential window, time constant ~pwrmtr_window
+    'fir_fold'            : True,  # folded kernels for symmetric filters (afsk.func.create_fir_sym)
+    'sampler'             : 'zc',  # 'zc' zero crossing gaps | 'pll' clock recovery
+    'gate'                : False, # activity gate, run the filters only while there is afsk (afsk.func.create_gate)
+    'gate_preroll'        : 250,   # ms of input replayed through the filters when the gate opens
+    'gate_hang'           : 250,   # ms the gate stays open after the last afsk
+    'gate_thr'            : 0.25,  # detector threshold, 0 white noise .. 1 pure tone
+    'gate_level'          : 32,    # min mean |sample|, digital silence never opens the gate
 }
 # bandpass_ncoefs 91
 
+
+# named option sets, eg. to run several demodulator variants side by side
+# (aprs_demod.py -p default,germany,ttwr), unset options come from fir_options
+fir_profiles = {
+    'default' : fir_options,
+    # germany tuned
+    'germany' : {
+        'bandpass_ncoefsbaud' : 3,
+        'bandpass_width'      : 460,
+        'bandpass_amark'      : 7,
+        'bandpass_aspace'     : 24,
+        'lpf_ncoefsbaud'      : 4,
+        'lpf_f'               : 1000,
+        'lpf_width'           : 360,
+        'lpf_aboost'          : 3,
+    },
+    # rtl_fm test tuning, working with ttwr
+    'ttwr' : {
+        'bandpass_ncoefsbaud' : 5,
+        'bandpass_width'      : 460,
+        'bandpass_amark'      : 6,
+        'bandpass_aspace'     : 6,
+        'lpf_ncoefsbaud'      : 5,
+        'lpf_f'               : 1000,
+        'lpf_width'           : 360,
+        'lpf_aboost'          : 3,
+    },
+    # optimizer tuning for tnc test, 1020 decoded frames (but NOT ttwr!)
+    'tnc' : {
+        'bandpass_ncoefsbaud' : 5,
+        'bandpass_width'      : 400,
+        'bandpass_amark'      : 1,
+        'bandpass_aspace'     : 3,
+        'lpf_ncoefsbaud'      : 5,
+        'lpf_f'               : 800,
+        'lpf_width'           : 250,
+        'lpf_aboost'          : 3,
+    },
+}
@@ -277,10 +277,116 @@ else:
                 run = 1
         return True if act > 10 else False # 10 - minimum number of run we need to declare signal detected
 
+def gate_run_len(fs, ftone):
+    # runs (consecutive samples of the same sign) this long are afsk half
+    # periods, white noise has (L+1)/2**L of its samples in such runs
+    return max(2, round(0.55*fs/(2*ftone)))
+
+def create_activity_detector(fs,
+                             ftone,          # highest afsk tone
+                             thr     = 0.25, # active above white noise + thr of the way to a pure tone
+                             level   = 32,   # and mean |v| above this, digital silence is one long run
+                             win     = 40,   # detector window, ms
+                             ):
+    # decides on windows of win ms whether there is afsk, the share of the
+    # window in long runs. windows run across blocks, inner(arr, i, siz, bias)
+    # reads arr[i:j] up to the end of the current window (or siz), returns j
+    # and the decision of the last whole window
+    L = gate_run_len(fs, ftone)
+    w = (L+1)/(1<<L)
+    thr = w + (1-w)*thr
+    win = max(1, round(fs*win/1000))
+    pol = False     # sign of the current run
+    run = 0         # its length
+    active = False  # decision of the last whole window
+    acc = 0         # samples in long runs in the current window
+    mag = 0         # sum of |v| in the current window
+    phase = 0       # samples in the current window
+    def inner(arr, i, siz, bias = 0):
+        nonlocal pol, run, active, acc, mag, phase
+        j = min(siz, i + win - phase)
+        for k in range(i, j):
+            v = arr[k] - bias
+            p = v > 0
+            if p == pol:
+                run += 1
+            else:
+                if run >= L:
+                    acc += run
+                pol = p
+                run = 1
+            mag += v if p else -v
+        phase += j - i
+        if phase == win:
+            active = acc >= thr*win and mag >= level*win
+            acc = 0
+            mag = 0
+            phase = 0
+        return j, active
+    return inner
+
+def create_gate(fs,
+                ftone,          # highest afsk tone
+                preroll = 250,  # ms of idle input replayed when the gate opens
+                hang    = 250,  # ms the gate stays open after the last active window
+                thr     = 0.25, # see create_activity_detector
+                level   = 32,
+                win     = 40,
+                ):
+    # activity gate, the filter chain only runs while there is afsk
+    # (create_activity_detector). the idle input of the last preroll ms is
+    # kept and replayed when the gate opens, the filters settle and the frame
+    # start (flags) is not lost. inner(arr, siz, bias) returns the segments to
+    # demodulate [(offset, samples, bias)], offset from arr[0], negative for
+    # replayed samples
+    detect = create_activity_detector(fs, ftone, thr, level, win)
+    npre = round(fs*preroll/1000)
+    nhang = round(fs*hang/1000)
+    ring = array('i', (0 for x in range(npre))) # last idle samples since the gate closed
+    ri = 0          # next ring index
+    nring = 0       # samples in ring, at most npre
+    is_open = False
+    left = 0        # samples before the gate closes
+    def inner(arr, siz, bias = 0):
+        nonlocal ri, nring, is_open, left
+        out = []
+        start = 0 if is_open else None # open segment in arr
+        i = 0
+        while i < siz:
+            j,act = detect(arr, i, siz, bias)
+            if is_open:
+                left = nhang if act else left - (j-i)
+                if left <= 0:
+                    is_open = False
+                    out.append((start, arr[start:j], bias))
+                    start = None
+            elif act:
+                is_open = True
+                left = nhang
+                if nring:
+                    # oldest first, ri is the oldest once the ring is full
+                    out.append((i-nring, ring[ri:nring] + ring[:ri], 0))
+                    ri = 0
+                    nring = 0
+                start = i
+            else:
+                # only the last npre samples of the window can stay
+                for k in range(max(i, j-npre), j):
+                    ring[ri] = arr[k] - bias
+                    ri += 1
+                    if ri == npre:
+                        ri = 0
+                nring = min(nring + j-i, npre)
+            i = j
+        if start is not None and start < siz:
+            out.append((start, arr[start:siz], bias))
+        return out
+    return inner
+
 if IS_UPY and HAS_VIPER:
-    def create_nrzi():
+    def create_nrzi(level = 0):
         #process the bit stream bit-by-bit with closure
-        c:int = 0
+        c:int = level
         # nl = array('B', [c])
         @micropython.viper
         def inner(b:int) -> int:
@@ -293,8 +399,8 @@ if IS_UPY and HAS_VIPER:
             return _c
         return inner
 else:
-    def create_nrzi():
-        c = 0
+    def create_nrzi(level = 0):
+        c = level
         def inner(b:int) -> int:
             nonlocal c
             if b == 0:
@@ -333,6 +439,15 @@ else:
             return r
         return inner
 
+# bit confidence (sampler magnitude) to a byte, log scale, 8 steps per octave
+# monotonic, ~9% resolution over the whole range, values < 16 unchanged
+def soft_q(x):
+    n = 0
+    while x >= 16:
+        x >>= 1
+        n += 1
+    return min(255, (n<<3) + x)
+
 if IS_UPY and HAS_C:
     def create_corr(ts,corr_delay):
         delay:int = int(round(corr_delay/ts)) #correlator delay (index)
@@ -389,69 +504,180 @@ else:
             return o
         return inner
 
+# power meter, rms of the last siz samples around their mean
+# running sum and sum of squares, updated with the sample in and the one out:
+#   sum((x-a)^2) = q - (2*s - siz*a)*a, a = s//siz
+# same output as recomputing the whole window, cost independent of siz
+#
+# ema=True, exponential window instead, time constant about siz samples
+# mean and variance kept as fixed point, scaled by 2^k
+#
+# viper ints are 32 bits, the samples are prescaled by 2^_PWRMTR_SHIFT so the
+# sums of squares fit: |v| < 2^15 and siz < _PWRMTR_MAX_SIZ. the output is
+# scaled back, within 2^_PWRMTR_SHIFT of the python one. larger windows run
+# the python versions
+_PWRMTR_SHIFT = const(4)
+_PWRMTR_MAX_SIZ = const(512)
+
+def create_power_meter_ema_py(siz):
+    m = 0 # mean<<k
+    e = 0 # variance<<k
+    k = max(1, siz.bit_length()-1) # floor(log2(siz))
+    def inner(v:int)->int:
+        nonlocal m, e
+        m += v - (m >> k)
+        d = v - (m >> k)
+        e += d*d - (e >> k)
+        return isqrt(e >> k)
+    return inner
+
+def create_power_meter_py(siz):
+    buf = array('i', (0 for x in range(siz)))
+    i = 0
+    s = 0 # running sum
+    q = 0 # running sum of squares
+    def inner(v:int)->int:
+        nonlocal i, s, q
+        # swap the oldest sample for the new one in the sums
+        u = buf[i]
+        buf[i] = v
+        s += v - u
+        q += v*v - u*u
+
+        # find dc point
+        a = s//siz
+        o = isqrt((q - (2*s - siz*a)*a)//siz)
+        i += 1
+        if i == siz:
+            i = 0
+        return o
+    return inner
+
+if IS_UPY and (HAS_C or HAS_VIPER):
+    def create_power_meter_ema(siz,):
+        if siz >= _PWRMTR_MAX_SIZ:
+            return create_power_meter_ema_py(siz)
+        st = array('i', (0, 0)) # mean<<k, variance<<k
+        k:int = max(1, len(bin(siz))-3) # floor(log2(siz))
+        @micropython.viper
+        def inner(v:int)->int:
+            _st = ptr32(st)
+            _k:int = int(k)
+            _v:int = v >> _PWRMTR_SHIFT
+            _m:int = int(utoi32(_st[0]))
+            _m += _v - (_m >> _k)
+            _d:int = _v - (_m >> _k)
+            _e:int = int(utoi32(_st[1]))
+            _e += _d*_d - (_e >> _k)
+            _st[0] = _m
+            _st[1] = _e
+            return int(isqrt((_e >> _k) << (2*_PWRMTR_SHIFT)))
+        return inner
+else:
+    create_power_meter_ema = create_power_meter_ema_py
+
 if IS_UPY and HAS_C:
-    def create_power_meter(siz:int,):
+    def create_power_meter(siz:int, ema = False):
+        if ema:
+            return create_power_meter_ema(siz)
         from cdsp import power_meter_core
         buf = array('i', (0 for x in range(siz)))
+        # running sum, running sum of squares, two int64 for power_meter_core.
+        # allocated as four 'i' rather than 'q', ports without long ints
+        # have no 'q' arrays, and only the c code reads them
+        st = array('i', (0, 0, 0, 0))
         i:int = 0
         @micropython.viper
         def inner(v:int)->int:
             nonlocal i
-            _o:int = int(power_meter_core(buf, v, i))
+            _o:int = int(power_meter_core(buf, st, v, i))
             _i:int = (int(i)+1)%int(siz)
             i = (_i<<1)|1 # INTEGER TO OBJECT HACK
             return _o
         return inner
 elif IS_UPY and HAS_VIPER:
-    def create_power_meter(siz,):
+    def create_power_meter(siz, ema = False):
+        if ema:
+            return create_power_meter_ema(siz)
+        if siz >= _PWRMTR_MAX_SIZ:
+            return create_power_meter_py(siz)
         buf = array('i', (0 for x in range(siz)))
+        st = array('i', (0, 0)) # running sum, running sum of squares
         i:int = 0
         @micropython.viper
         def inner(v:int)->int:
             nonlocal i
             _buf = ptr32(buf)     # indexing ALWAYS return uint
+            _st = ptr32(st)
             _i:int = int(i)
             _siz:int = int(siz)
-            _buf[_i] = v # ok, can assign negative number
 
-            # find dc point
-            _a:int = 0
-            for j in range(_siz):
-                _a += int(utoi32(_buf[j]))
-            _a = _a//_siz
+            # swap the oldest (prescaled) sample for the new one in the sums
+            _v:int = v >> _PWRMTR_SHIFT
+            _u:int = int(utoi32(_buf[_i])) # cast to int32
+            _s:int = int(utoi32(_st[0])) + _v - _u
+            _q:int = int(utoi32(_st[1])) + _v*_v - _u*_u
+            _buf[_i] = _v # ok, can assign negative number
+            _st[0] = _s
+            _st[1] = _q
 
-            _o:int = 0
-            for j in range(_siz):
-                _b:int = int(utoi32(_buf[j])) # cast to int32
-                _b -= _a
-                _o += _b*_b
-            _o = int(isqrt(_o//_siz))
+            # find dc point
+            _a:int = _s//_siz
+            _o:int = int(isqrt(((_q - (2*_s - _siz*_a)*_a)//_siz) << (2*_PWRMTR_SHIFT)))
             _i = (_i+1)%_siz
             i = (_i<<1)|1 # INTEGER TO OBJECT HACK
             return _o
         return inner
 else:
-    def create_power_meter(siz,):
-        buf = array('i', (0 for x in range(siz)))
-        i = 0
-        def inner(v:int)->int:
-            nonlocal i
-            buf[i] = v
+    def create_power_meter(siz, ema = False):
+        if ema:
+            return create_power_meter_ema(siz)
+        return create_power_meter_py(siz)
 
-            # find dc point
-            a = 0
-            for k in range(siz):
-                a += buf[k]
-            a //= siz
-
-            o = 0
-            for k in range(siz):
-                b = buf[k]-a
-                o += b*b
-            o = isqrt(o//siz)
-            i = (i+1)%siz
-            return o
-        return inner
+def create_squelch(fs,
+                   squelch = 100, # lowest level
+                   ratio   = 2,   # times the noise floor
+                   secs    = 5,   # history, floor and traffic level
+                   seg     = 100, # ms segments
+                   ):
+    # adaptive squelch level from the power meter output. the noise floor is
+    # the lowest mean level of the idle (no afsk, create_activity_detector)
+    # seg ms segments of the last secs seconds (minimum tracking), the level
+    # ratio times the floor but at most an eighth of the way from the floor
+    # to the loudest segment, a weak signal on a noisy channel is not muted.
+    # fixed squelch without an idle segment in the history (busy channel)
+    # fed the sum of the power meter output of each block and whether the
+    # block was idle, inner(psum, siz, idle) returns (level, floor)
+    segsiz = max(1, round(fs*seg/1000))
+    nseg = max(1, round(1000*secs/seg))
+    hist = []     # (mean, idle) of the segments, oldest first
+    acc = 0       # sum of the current segment
+    n = 0         # and its samples
+    quiet = True  # no afsk in the current segment
+    level = squelch
+    floor = 0
+    def inner(psum, siz, idle):
+        nonlocal acc, n, quiet, level, floor
+        acc += psum
+        n += siz
+        quiet = quiet and idle
+        if n < segsiz:
+            return level, floor
+        hist.append((acc//n, quiet))
+        if len(hist) > nseg:
+            hist.pop(0)
+        acc = 0
+        n = 0
+        quiet = True
+        ms = [m for m,q in hist if q]
+        floor = min(ms) if ms else 0
+        if floor:
+            peak = max(m for m,q in hist)
+            level = max(squelch, min(int(ratio*floor), floor + (peak-floor)//8))
+        else:
+            level = squelch
+        return level, floor
+    return inner
 
 if IS_UPY and HAS_C:
     def create_fir(coefs, scale):
@@ -517,6 +743,98 @@ else:
             return o
         return inner
 
+# symmetric (linear phase) fir, coefs[j] == coefs[ncoefs-1-j] as designed by firls
+# the delay line is folded, the two samples sharing a coef are added first,
+# halving the multiplies. full precision sum, scaled once per output
+# the delay line is kept twice (buf[i] and buf[i+ncoefs]) so the window is
+# always contiguous, no modulo per tap
+if IS_UPY and HAS_C:
+    def create_fir_sym(coefs, scale):
+        from cdsp import fir_sym_core
+        ncoefs:int = len(coefs)
+        hcoefs = array('i', (coefs[i] for i in range(ncoefs-ncoefs//2)))
+        buf = array('i', (0 for x in range(2*ncoefs)))
+        i:int = 0
+        scale:int = scale or 1
+        @micropython.viper
+        def inner(v:int)->int:
+            nonlocal i
+            _o:int = int(fir_sym_core(hcoefs, buf, v, i, scale)) # CALL C
+            _i:int = (int(i)+1)%int(ncoefs)
+            i = (_i<<1)|1 # INTEGER TO OBJECT HACK
+            return _o
+        return inner
+elif IS_UPY and HAS_VIPER:
+    def create_fir_sym(coefs, scale):
+        ncoefs:int = len(coefs)
+        nh:int = ncoefs//2
+        hcoefs = array('i', (coefs[i] for i in range(ncoefs-nh)))
+        buf = array('i', (0 for x in range(2*ncoefs)))
+        i:int = 0
+        scale = scale or 1
+        @micropython.viper
+        def inner(v:int)->int:
+            nonlocal i
+            _buf = ptr32(buf)       # indexing ALWAYS return uint
+            _coefs = ptr32(hcoefs)  # indexing ALWAYS return uint
+            _i:int = int(i)
+            _n:int = int(ncoefs)
+            _nh:int = int(nh)
+            _scale:int = int(scale)
+
+            _buf[_i] = v # ok, can assign negative number
+            _buf[_i+_n] = v
+            _i += 1
+            if _i == _n:
+                _i = 0
+            _k:int = _i+_n-1 # newest sample, oldest is at _i
+            # viper ints are 32 bits, the sum of the folded products would
+            # overflow. each product p is split as q*scale + r (0 <= r < scale,
+            # floor division), sum(q) + sum(r)//scale is the full precision
+            # sum scaled once, as the python and C kernels
+            _q:int = 0
+            _r:int = 0
+            for j in range(_nh):
+                _x:int = int(utoi32(_buf[_k-j])) + int(utoi32(_buf[_i+j]))
+                _p:int = _x * int(utoi32(_coefs[j]))
+                _d:int = _p // _scale
+                _q += _d
+                _r += _p - _d*_scale
+            if _n & 1:
+                _p = int(utoi32(_buf[_k-_nh])) * int(utoi32(_coefs[_nh]))
+                _d = _p // _scale
+                _q += _d
+                _r += _p - _d*_scale
+            i = (_i<<1)|1 # INTEGER TO OBJECT HACK
+            return _q + _r // _scale
+        return inner
+else:
+    def create_fir_sym(coefs, scale):
+        # PYTHON
+        ncoefs = len(coefs)
+        nh = ncoefs//2
+        hcoefs = array('i', (coefs[i] for i in range(nh)))
+        cmid = coefs[nh] if ncoefs%2 else 0
+        buf = array('i', (0 for x in range(2*ncoefs)))
+        idx = 0
+        scale = scale or 1
+        def inner(v:int)->int:
+            nonlocal idx
+            buf[idx] = v
+            buf[idx+ncoefs] = v
+            idx += 1
+            if idx == ncoefs:
+                idx = 0
+            k = idx+ncoefs-1 # newest sample, oldest is at idx
+            o = cmid*buf[k-nh]
+            for j in range(nh):
+                o += hcoefs[j]*(buf[k-j] + buf[idx+j])
+            return o // scale
+        return inner
+
+def is_symmetric(coefs):
+    return all(coefs[j] == coefs[-1-j] for j in range(len(coefs)//2))
+
 def lpf_fir_design(ncoefs,       # filter size
                    fa,           # cut-off f
                    fs,           # fs
@@ -556,8 +874,71 @@ def bandpass_fir_design(ncoefs,            # filter size
     g = int((abs(g1)+abs(g2))/2)
     return coefs,g
 
+def resample_ratio(fs_in, fs_out):
+    # fs_out/fs_in as up/down, reduced
+    a,b = int(fs_out),int(fs_in)
+    while b:
+        a,b = b,a%b
+    return int(fs_out)//a, int(fs_in)//a
+
+_RESAMPLER_SHIFT = const(15)
+
+def resampler_fir_design(up, down,
+                         nphase = 32, # taps per polyphase branch (at the input rate)
+                         ):
+    # windowed sinc (blackman) anti-aliasing/interpolation lowpass at the
+    # up sampled rate, cut-off at 0.8 of the lower nyquist, integer coefs
+    # scaled by 2**_RESAMPLER_SHIFT and by up (zero stuffing gain)
+    ncoefs = up*nphase
+    fc = 0.8*0.5/max(up, down) # normalized to the up sampled rate
+    m = ncoefs-1
+    h = []
+    for i in range(ncoefs):
+        t = i - m/2
+        x = 2*fc if t == 0 else math.sin(2*math.pi*fc*t)/(math.pi*t)
+        w = 0.42 - 0.5*math.cos(2*math.pi*i/m) + 0.08*math.cos(4*math.pi*i/m)
+        h.append(x*w)
+    g = sum(h)/up
+    return [round(x/g*(1<<_RESAMPLER_SHIFT)) for x in h]
+
+def create_resampler(up, down, nphase = 32):
+    # rational polyphase resampler, fs*up/down, eg. 48000 -> 12000 (1/4),
+    # 44100 -> 11025 (1/4), 48000 -> 11025 (147/640). only the taps of the
+    # polyphase branch of each output sample are computed, the zeros of the
+    # up sampling and the dropped samples of the down sampling never are.
+    # returns (inner, delay), inner(arr, siz, bias) returns (array, size) of
+    # the output samples, delay the group delay of the (linear phase) filter
+    # in up sampled samples: output k is input sample (k*down - delay)/up
+    coefs = resampler_fir_design(up, down, nphase)
+    # branch p, reversed so taps line up with the input history
+    branches = [array('i', (coefs[p + j*up] for j in range(nphase-1, -1, -1)))
+                for p in range(up)]
+    hist = array('i', (0 for x in range(nphase-1)))
+    out = array('i')
+    t = 0 # next output position in up sampled units, from the block start
+    def inner(arr, siz, bias = 0):
+        nonlocal hist, out, t
+        buf = hist + array('i', (arr[i] - bias for i in range(siz)))
+        nout = (siz*up - t + down - 1)//down if siz*up > t else 0
+        if len(out) < nout:
+            out = array('i', (0 for x in range(nout)))
+        for k in range(nout):
+            n = t//up
+            h = branches[t - n*up]
+            o = 0
+            for j in range(nphase):
+                o += h[j]*buf[n+j]
+            out[k] = o >> _RESAMPLER_SHIFT
+            t += down
+        t -= siz*up
+        hist = buf[len(buf)-(nphase-1):]
+        return out, nout
+    return inner, (len(coefs)-1)//2
+
 def create_sampler(fbaud, 
-                   fs, ):
+                   fs,
+                   conf = None, # optional array('i', (0,)), peak |v| of the run the bits come from
+                   ):
     tbaud = fs/fbaud #inverted for t
     ibaud = round(tbaud) #integer step
     ibaud_2 = round(tbaud/2)
@@ -567,10 +948,11 @@ def create_sampler(fbaud,
     lastx = 0 #last crossing
     o = 0
     oidx = 0
+    pk = 0 # peak of the current run
     _NONE = 2
     def inner(v:int)->int:
         nonlocal idx,buf,lastx
-        nonlocal o,oidx
+        nonlocal o,oidx,pk
         try:
             buf[idx] = v
         except OverflowError:
@@ -578,7 +960,15 @@ def create_sampler(fbaud,
                 buf[idx] = 0x7fffffff
             else:
                 buf[idx] = -0x7fffffff
-        if (buf[(idx-1)%buflen] > 0) != (buf[idx] > 0):
+        cross = (buf[(idx-1)%buflen] > 0) != (buf[idx] > 0)
+        if conf:
+            a = -v if v < 0 else v
+            if cross:
+                conf[0] = pk if pk < 0x7fffffff else 0x7fffffff
+                pk = a
+            elif a > pk:
+                pk = a
+        if cross:
         # if (buf[(idx-1)%buflen] > 0) != (buf[idx] > 0) and\
            # (buf[(idx-1)%buflen] == buf[(idx-2)%buflen]):
             #detected crossing
@@ -600,3 +990,46 @@ def create_sampler(fbaud,
         # print('&',o,end='')
         return o
     return inner
+
+# digital pll clock recovery
+# a phase accumulator advances fbaud/fs of a bit per sample (1 bit = _PLL_ONE,
+# no rounding of the samples per bit), a bit is sampled each time it passes
+# mid-bit. transitions should happen at phase 0, each one pulls the phase
+# towards 0, less once locked. lock, optional array('i', (0,)) set to 1
+# while transitions keep landing within 1/8 bit of where expected
+_PLL_ONE  = const(1<<16)
+_PLL_HALF = const(1<<15)
+def create_sampler_pll(fbaud,
+                       fs,
+                       lock = None,
+                       conf = None, # optional array('i', (0,)), |v| where the last bit was sampled
+                       ):
+    step = round(_PLL_ONE*fbaud/fs)
+    near = _PLL_ONE>>3
+    phase = 0
+    prev = False # last sample > 0
+    good = 0     # transitions near phase 0, lock at 4
+    _NONE = 2
+    def inner(v:int)->int:
+        nonlocal phase, prev, good
+        pos = v > 0
+        if pos != prev:
+            prev = pos
+            if -near < phase < near:
+                good = good+1 if good < 8 else 8
+            else:
+                good = good-2 if good > 2 else 0
+            if lock:
+                lock[0] = 1 if good >= 4 else 0
+            # inertia, keep 3/4 of the error locked, 1/2 searching
+            phase = (phase*3)>>2 if good >= 4 else phase>>1
+        phase += step
+        if phase < _PLL_HALF:
+            return _NONE
+        phase -= _PLL_ONE
+        if conf:
+            a = v if pos else -v
+            conf[0] = a if a < 0x7fffffff else 0x7fffffff
+        # the correlator inverts mark/space, invert here to mark=1, space=0
+        return 0 if pos else 1
+    return inner
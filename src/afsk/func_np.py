@@ -0,0 +1,375 @@
+
+# numpy block processing versions of the afsk.func dsp closures
+# each closure takes a block (np.ndarray int64) of samples and returns a block,
+# internal delay lines are carried across calls so consecutive blocks are
+# processed exactly as the sample-by-sample python closures would
+# numpy is optional, only imported when the numpy backend is selected
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+_NONE = 2
+
+def isqrt_np(x):
+    # exact integer floor sqrt, float sqrt then correct the off by one cases
+    r = np.sqrt(x.astype(np.float64)).astype(np.int64)
+    r -= (r*r > x)
+    r += ((r+1)*(r+1) <= x)
+    return r
+
+def soft_q_np(x):
+    # afsk.func.soft_q on an array
+    x = np.asarray(x, dtype=np.int64)
+    _,e = np.frexp(x.astype(np.float64)) # bit length, exact for these sizes
+    n = np.maximum(e - 4, 0)
+    return np.minimum(255, (n<<3) + (x>>n)).astype(np.uint8)
+
+def create_fir_np(coefs, scale):
+    ncoefs = len(coefs)
+    # reversed, the oldest sample in a window lines up with the last coef
+    rcoefs = np.array(coefs, dtype=np.int64)[::-1]
+    state = np.zeros(ncoefs-1, dtype=np.int64)
+    scale = scale or 1
+    def inner(x):
+        nonlocal state
+        if len(x) == 0:
+            return x
+        xs = np.concatenate((state, x))
+        w = sliding_window_view(xs, ncoefs)
+        # same rounding as the python closure, floor divide each tap
+        o = np.floor_divide(w * rcoefs, scale).sum(axis=1)
+        state = xs[len(xs)-(ncoefs-1):]
+        return o
+    return inner
+
+def create_fir_sym_np(coefs, scale):
+    # afsk.func.create_fir_sym, full precision sum scaled once per output
+    ncoefs = len(coefs)
+    rcoefs = np.array(coefs, dtype=np.int64)[::-1]
+    state = np.zeros(ncoefs-1, dtype=np.int64)
+    scale = scale or 1
+    def inner(x):
+        nonlocal state
+        if len(x) == 0:
+            return x
+        xs = np.concatenate((state, x))
+        w = sliding_window_view(xs, ncoefs)
+        o = (w @ rcoefs) // scale
+        state = xs[len(xs)-(ncoefs-1):]
+        return o
+    return inner
+
+def create_fir_fft_np(coefs, scale, nfft = None, auto = False):
+    # overlap-save block convolution, same outputs as create_fir_sym_np
+    # the integer sums are recovered exactly by rounding (float64 error is
+    # far below 0.5 for 16 bit samples) and scaled once
+    # auto, blocks too short for the fft to pay off are filtered directly
+    ncoefs = len(coefs)
+    if not nfft:
+        nfft = 64
+        while nfft < 4*ncoefs:
+            nfft <<= 1
+    step = nfft - (ncoefs-1) # new outputs per fft segment
+    h = np.fft.rfft(np.array(coefs, dtype=np.float64), nfft)
+    rcoefs = np.array(coefs, dtype=np.int64)[::-1]
+    state = np.zeros(ncoefs-1, dtype=np.int64)
+    scale = scale or 1
+    def inner(x):
+        nonlocal state
+        n = len(x)
+        if n == 0:
+            return x
+        xs = np.concatenate((state, x))
+        state = xs[len(xs)-(ncoefs-1):]
+        if auto and n*(ncoefs-26) <= 35000:
+            # direct form is n*ncoefs multiply-adds, the fft costs about as
+            # much as 35000 + 26*n of them (measured on x86)
+            return (sliding_window_view(xs, ncoefs) @ rcoefs) // scale
+        # pad to whole segments, one fft per segment
+        nseg = (n + step - 1)//step
+        xs = np.concatenate((xs, np.zeros(nseg*step + ncoefs-1 - len(xs), dtype=np.int64)))
+        segs = sliding_window_view(xs, nfft)[::step]
+        y = np.fft.irfft(np.fft.rfft(segs, axis=1) * h, nfft, axis=1)
+        o = np.rint(y[:, ncoefs-1:]).astype(np.int64).reshape(-1)[:n]
+        return o // scale
+    return inner
+
+def create_corr_np(ts, corr_delay):
+    delay = int(round(corr_delay/ts)) #correlator delay (index)
+    state = np.zeros(delay, dtype=np.int64)
+    def inner(x):
+        nonlocal state
+        xs = np.concatenate((state, x))
+        d = xs[:len(x)] # delayed samples
+        o = isqrt_np(np.abs(x*d)) * np.sign(x) * np.sign(d)
+        state = xs[len(xs)-delay:]
+        return o
+    return inner
+
+def create_power_meter_np(siz, ema = False):
+    if ema:
+        return create_power_meter_ema_np(siz)
+    state = np.zeros(siz-1, dtype=np.int64)
+    def inner(x):
+        nonlocal state
+        if len(x) == 0:
+            return x
+        xs = np.concatenate((state, x))
+        # window sums from running sums, as afsk.func.create_power_meter
+        c = np.concatenate(((0,), np.cumsum(xs)))
+        c2 = np.concatenate(((0,), np.cumsum(xs*xs)))
+        s = c[siz:] - c[:-siz]
+        q = c2[siz:] - c2[:-siz]
+        # find dc point
+        a = s // siz
+        o = isqrt_np((q - (2*s - siz*a)*a) // siz)
+        state = xs[len(xs)-(siz-1):]
+        return o
+    return inner
+
+def create_power_meter_ema_np(siz):
+    # recursive, no block form with the same rounding, walk the samples
+    from afsk.func import create_power_meter_ema
+    pwrmtr = create_power_meter_ema(siz)
+    def inner(x):
+        return np.array([pwrmtr(v) for v in x.tolist()], dtype=np.int64)
+    return inner
+
+def create_sampler_np(fbaud,
+                      fs,
+                      soft = False, # also the confidence of each bit, as afsk.func.create_sampler conf
+                      ):
+    # vectorized zero crossing detection, the (few) crossings are then
+    # walked in python with the same rules as afsk.func.create_sampler
+    # returns (bits, confs, idxs), idxs the index in x where each bit was
+    # output, confs None if not soft
+    tbaud = fs/fbaud #inverted for t
+    ibaud = round(tbaud) #integer step
+    ibaud_2 = round(tbaud/2)
+    prev  = 0 # last sample of the previous block
+    lastx = 0 # samples since last crossing
+    o     = 0 # current bit value
+    oidx  = 0 # bits still to output for the last crossing
+    c     = 0 # confidence of the bits of the last crossing
+    pk    = 0 # peak of the current run
+    def inner(x):
+        nonlocal prev, lastx, o, oidx, c, pk
+        n = len(x)
+        if n == 0:
+            z = np.zeros(0, dtype=np.int64)
+            return z.astype(np.uint8), (z if soft else None), z
+        pos = x > 0
+        prevpos = np.empty(n, dtype=bool)
+        prevpos[0] = prev > 0
+        prevpos[1:] = pos[:-1]
+        xs = np.flatnonzero(pos != prevpos).tolist()
+        if soft:
+            # peak of each run, the run ending at xs[j] starts at xs[j-1]
+            a = np.minimum(np.abs(x), 0x7fffffff)
+            pks = np.maximum.reduceat(a, xs).tolist() if xs else []
+            pk0 = max(pk, int(a[:xs[0]].max())) if xs and xs[0] else pk
+            pk = pks[-1] if xs else max(pk, int(a.max()))
+
+        bits = []
+        confs = []
+        idxs = []
+        # flush bits pending from the previous block
+        k = min(oidx, xs[0] if xs else n)
+        bits.extend([o]*k)
+        confs.extend([c]*k)
+        idxs.extend(range(k))
+        oidx -= k
+        for j,t in enumerate(xs):
+            lx = t - xs[j-1] - 1 if j else lastx + t
+            if soft:
+                c = pks[j-1] if j else pk0
+            if lx > ibaud_2 and lx < ibaud*8:
+                oidx = (lx - ibaud_2)//ibaud+1 #number of baud periods
+                # the correlator inverts mark/space, invert here to mark=1, space=0
+                o = 0 if prevpos[t] else 1
+            else:
+                oidx = 0
+            # one bit out per sample until the next crossing
+            k = min(oidx, (xs[j+1] if j+1 < len(xs) else n) - t)
+            bits.extend([o]*k)
+            confs.extend([c]*k)
+            idxs.extend(range(t, t+k))
+            oidx -= k
+        lastx = n - 1 - xs[-1] if xs else lastx + n
+        prev = int(x[-1])
+        return (np.array(bits, dtype=np.uint8),
+                np.array(confs, dtype=np.int64) if soft else None,
+                np.array(idxs, dtype=np.int64))
+    return inner
+
+def create_sampler_pll_np(fbaud,
+                          fs,
+                          lock = None,
+                          soft = False, # also the confidence of each bit, as afsk.func.create_sampler_pll conf
+                          ):
+    # afsk.func.create_sampler_pll on blocks, same bits
+    # returns (bits, confs, idxs) as create_sampler_np
+    # the phase only changes course at transitions (found vectorized), in
+    # between it advances step per sample and every mid-bit pass is a bit of
+    # the same value, so each run is a few integer ops
+    from afsk.func import _PLL_ONE
+    from afsk.func import _PLL_HALF
+    step = round(_PLL_ONE*fbaud/fs)
+    near = _PLL_ONE>>3
+    phase = 0
+    prev = False
+    good = 0
+    def inner(x):
+        nonlocal phase, prev, good
+        n = len(x)
+        if n == 0:
+            z = np.zeros(0, dtype=np.int64)
+            return z.astype(np.uint8), (z if soft else None), z
+        pos = x > 0
+        prevpos = np.empty(n, dtype=bool)
+        prevpos[0] = prev
+        prevpos[1:] = pos[:-1]
+        xs = np.flatnonzero(pos != prevpos).tolist()
+
+        bits = []
+        ks = [] # samples where the bits were taken
+        level = 0 if prev else 1 # bit value of the current run
+        t0 = 0
+        for t in xs + [n]:
+            # run [t0, t), phase += step per sample, wrapping past mid-bit
+            u = phase + (t-t0)*step
+            w = (u + _PLL_HALF)//_PLL_ONE
+            bits.extend([level]*w)
+            for m in range(w):
+                ks.append(t0 + (_PLL_HALF + m*_PLL_ONE - phase + step-1)//step - 1)
+            phase = u - w*_PLL_ONE
+            if t == n:
+                break
+            # transition at t
+            if -near < phase < near:
+                good = good+1 if good < 8 else 8
+            else:
+                good = good-2 if good > 2 else 0
+            if lock:
+                lock[0] = 1 if good >= 4 else 0
+            phase = (phase*3)>>2 if good >= 4 else phase>>1
+            level = 1 - level
+            t0 = t
+        prev = bool(pos[-1])
+        ks = np.array(ks, dtype=np.int64)
+        return (np.array(bits, dtype=np.uint8),
+                np.minimum(np.abs(x[ks]), 0x7fffffff) if soft else None,
+                ks)
+    return inner
+
+def create_activity_detector_np(fs, ftone, thr = 0.25, level = 32, win = 40):
+    # afsk.func.create_activity_detector on blocks (np.ndarray int64, no
+    # bias), same decisions, inner(x, i, siz) returns j and the decision
+    from afsk.func import gate_run_len
+    L = gate_run_len(fs, ftone)
+    w = (L+1)/(1<<L)
+    thr = w + (1-w)*thr
+    win = max(1, round(fs*win/1000))
+    pol = False
+    run = 0
+    active = False
+    acc = 0
+    mag = 0
+    phase = 0
+    def inner(x, i, siz, bias = 0):
+        nonlocal pol, run, active, acc, mag, phase
+        j = min(siz, i + win - phase)
+        x = x[i:j]
+        p = x > 0
+        # runs starting in x, the first one ends the run carried over
+        starts = np.flatnonzero(np.concatenate(((p[0] != pol,), p[1:] != p[:-1])))
+        if len(starts):
+            lens = np.diff(starts, prepend = -run)
+            acc += int(lens[lens >= L].sum())
+            run = len(x) - int(starts[-1])
+        else:
+            run += len(x)
+        pol = bool(p[-1])
+        mag += int(np.abs(x).sum())
+        phase += len(x)
+        if phase == win:
+            active = acc >= thr*win and mag >= level*win
+            acc = 0
+            mag = 0
+            phase = 0
+        return j, active
+    return inner
+
+def create_gate_np(fs, ftone, preroll = 250, hang = 250, thr = 0.25, level = 32, win = 40):
+    # afsk.func.create_gate on blocks (np.ndarray int64, no bias), same
+    # decisions, inner(x) returns [(offset, samples)]
+    detect = create_activity_detector_np(fs, ftone, thr, level, win)
+    npre = round(fs*preroll/1000)
+    nhang = round(fs*hang/1000)
+    ring = np.zeros(0, dtype=np.int64)
+    is_open = False
+    left = 0
+    def inner(x):
+        nonlocal ring, is_open, left
+        out = []
+        siz = len(x)
+        start = 0 if is_open else None
+        i = 0
+        while i < siz:
+            j,act = detect(x, i, siz)
+            if is_open:
+                left = nhang if act else left - (j-i)
+                if left <= 0:
+                    is_open = False
+                    out.append((start, x[start:j]))
+                    start = None
+            elif act:
+                is_open = True
+                left = nhang
+                if len(ring):
+                    out.append((i-len(ring), ring))
+                    ring = np.zeros(0, dtype=np.int64)
+                start = i
+            else:
+                ring = np.concatenate((ring, x[i:j]))[-npre:] if npre else ring
+            i = j
+        if start is not None and start < siz:
+            out.append((start, x[start:siz]))
+        return out
+    return inner
+
+def create_unnrzi_np():
+    c = 1
+    def inner(bs):
+        nonlocal c
+        if len(bs) == 0:
+            return bs
+        p = np.empty(len(bs), dtype=np.uint8)
+        p[0] = c
+        p[1:] = bs[:-1]
+        c = int(bs[-1])
+        return (bs == p).astype(np.uint8)
+    return inner
+
+def create_resampler_np(up, down, nphase = 32):
+    # afsk.func.create_resampler on blocks, same coefs, outputs and delay
+    from afsk.func import resampler_fir_design
+    from afsk.func import _RESAMPLER_SHIFT
+    coefs = np.array(resampler_fir_design(up, down, nphase), dtype=np.int64)
+    # branch p, reversed so taps line up with the input history
+    branches = coefs.reshape(nphase, up).T[:, ::-1]
+    hist = np.zeros(nphase-1, dtype=np.int64)
+    t = 0 # next output position in up sampled units, from the block start
+    def inner(x):
+        nonlocal hist, t
+        buf = np.concatenate((hist, x))
+        siz = len(x)
+        nout = (siz*up - t + down - 1)//down if siz*up > t else 0
+        ts = t + down*np.arange(nout, dtype=np.int64)
+        n = ts//up
+        w = sliding_window_view(buf, nphase)[n]
+        o = (w * branches[ts - n*up]).sum(axis=1) >> _RESAMPLER_SHIFT
+        t += nout*down - siz*up
+        hist = buf[len(buf)-(nphase-1):]
+        return o
+    return inner, (len(coefs)-1)//2
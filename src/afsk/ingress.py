@@ -1,5 +1,7 @@
 
 import os
+import sys
+import time
 import asyncio
 
 import struct
@@ -10,69 +12,315 @@ from lib.utils import eprint
 
 #micropython/python compatibility
 from lib.compat import print_exc
+from lib.compat import array_bytes
+from lib.compat import IS_UPY
+from lib.compat import ticks_us
+from lib.compat import ticks_diff
+
 
 SAMPLES_SIZE   = 20000
 
+WAVE_FORMAT_PCM        = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xfffe
+
+# read a RIFF/WAVE header from f (file, stdin...), up to the start of the
+# samples. returns (rate, channels, size) of the 16 bit pcm data, size in
+# bytes (None if unknown), f is left at the first sample. None if f is not a
+# wav file, the first 12 bytes are consumed anyway
+def read_wav_header(f):
+    hdr = f.read(12)
+    if len(hdr) < 12 or hdr[0:4] != b'RIFF' or hdr[8:12] != b'WAVE':
+        return None
+    fmt = None
+    while True:
+        chdr = f.read(8)
+        if len(chdr) < 8:
+            raise Exception('wav without data chunk')
+        cid = chdr[0:4]
+        csiz = struct.unpack('<I', chdr[4:8])[0]
+        if cid == b'data':
+            if not fmt:
+                raise Exception('wav data before fmt chunk')
+            # streamed wavs leave the sizes at 0 or 0xffffffff
+            size = csiz if 0 < csiz < 0xffffffff else None
+            return fmt + (size,)
+        body = f.read(csiz + (csiz&1)) # chunks are padded to even sizes
+        if cid == b'fmt ':
+            tag,channels,rate,_,_,bits = struct.unpack('<HHIIHH', body[0:16])
+            if tag == WAVE_FORMAT_EXTENSIBLE and csiz >= 26:
+                tag = struct.unpack('<H', body[24:26])[0] # sub format guid starts with the tag
+            if tag != WAVE_FORMAT_PCM or bits != 16:
+                raise Exception('unsupported wav format {} {} bits, 16 bit pcm only'.format(tag, bits))
+            fmt = (rate, channels)
+
+# open a wav or raw file of 16 bit samples for demodulation
+# returns (source, rate, channels), rate and channels None for raw files
+# on CPython the samples are mmap'd and source is a memoryview of samples
+# ('h' or 'H' as stream_type, first channel only), decoded straight from
+# the page cache. elsewhere (or big endian hosts) source is the open file,
+# positioned on the first sample
+def open_samples(path, stream_type = 's16'):
+    f = open(path, 'rb')
+    wav = read_wav_header(f)
+    if wav:
+        rate,channels,size = wav
+        offset = f.tell()
+    else:
+        rate,channels,size = None,None,None
+        offset = 0
+        f.seek(0)
+    if IS_UPY or sys.byteorder == 'big':
+        if channels and channels > 1:
+            raise Exception('multi channel wav files need mmap (CPython)')
+        return f, rate, channels
+    import mmap
+    if os.fstat(f.fileno()).st_size <= offset:
+        return memoryview(b'').cast('h'), rate, channels
+    mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    f.close() # the mapping stays valid
+    end = len(mm) if size is None else min(len(mm), offset+size)
+    nch = channels or 1
+    end -= (end-offset) % (2*nch) # whole frames
+    mv = memoryview(mm)[offset:end].cast('h' if wav or stream_type=='s16' else 'H')
+    return (mv[::nch] if nch > 1 else mv), rate, channels
+
+
+# accounting of a live source (stdin, rtl_fm), the samples delivered vs the
+# wall clock at the nominal rate. the consumer calls inner(siz, wait, busy)
+# for each block of siz samples, wait the seconds it waited for the block and
+# busy the seconds it took to decode it. the lag (wall clock - samples) is
+# measured when the block arrived:
+#   the consumer had to wait, it is caught up, lag above the lowest seen is
+#   samples the source never delivered (dropped by rtl_fm when the pipe was
+#   full, rtl_fm restarts, ...), a gap
+#   the block was already there, lag above tolerance is a backlog, the
+#   demodulator is behind (cpu starved), the pipe fills and samples are lost
+#   samples ahead of the wall clock, wrong rate or not a live source
+# events are reported with report (eprint, '@' wall clock time) and the
+# demodulator real time factor (seconds of audio decoded per second), status
+# (dict) is kept up to date: samples, seconds (since the first block), rate
+# (measured), lag (backlog, s), max_lag, gaps, lost (s), behind (times), rtf
+def create_source_monitor(rate,
+                          tolerance = 0.5,   # seconds, more than the delivery jitter
+                          report    = eprint,
+                          status    = None,
+                          ):
+    status = {} if status is None else status
+    status.update(samples = 0, seconds = 0.0, rate = 0.0, lag = 0.0, max_lag = 0.0,
+                  gaps = 0, lost = 0.0, behind = 0, rtf = 0.0)
+    last = None     # ticks_us() of the last block
+    elapsed = 0.0   # seconds since the first sample
+    base = 0.0      # lowest lag caught up, the delivery latency
+    busy_t = 0.0    # seconds decoding
+    is_behind = False
+    is_ahead = False
+    def inner(siz, wait, busy):
+        nonlocal last, elapsed, base, busy_t, is_behind, is_ahead
+        now = ticks_us()
+        if last is None:
+            # the first block arrived as its last sample was sampled
+            elapsed = siz/rate + busy
+        else:
+            elapsed += ticks_diff(now, last)/1e6
+        last = now
+        n = status['samples'] + siz
+        busy_t += busy
+        lag = elapsed - busy - n/rate - base
+        status['samples'] = n
+        status['seconds'] = elapsed
+        status['rate'] = n/elapsed
+        status['rtf'] = n/rate/busy_t if busy_t else 0.0
+        at = time.time() - busy
+        if lag < -tolerance and not is_ahead:
+            is_ahead = True
+            report('# SRC  @{:.3f} {:.2f}s of samples ahead of the wall clock at {} Hz, not live or wrong rate'.format(
+                   at, -lag, rate))
+        if wait > 0.002:
+            # caught up
+            if is_behind:
+                is_behind = False
+                report('# SRC  @{:.3f} caught up, rtf {:.2f}'.format(at, status['rtf']))
+            if lag > tolerance:
+                status['gaps'] += 1
+                status['lost'] += lag
+                report('# SRC  @{:.3f} gap {:.2f}s ({} samples), {} gaps {:.2f}s lost, rtf {:.2f}'.format(
+                       at, lag, int(lag*rate), status['gaps'], status['lost'], status['rtf']))
+            if lag > tolerance or lag < 0:
+                base += lag
+                lag = 0.0
+        elif lag > tolerance and not is_behind:
+            is_behind = True
+            status['behind'] += 1
+            report('# SRC  @{:.3f} behind {:.2f}s, rtf {:.2f}'.format(at, lag, status['rtf']))
+        status['lag'] = max(0.0, lag)
+        status['max_lag'] = max(status['max_lag'], status['lag'])
+    return inner
 
-async def read_samples_from_rtl_fm(in_q, 
+# rtl_fm samples, 22050 Hz s16 on stdout
+RTL_FM_CMD = 'rtl_fm -f 144.390M -s 22050 -g 10'
+
+# rtl_fm stderr messages of a lost or unusable device, rtl_fm is restarted
+RTL_FM_ERRORS = ('Failed to open rtlsdr device',
+                 'No supported devices found',
+                 'usb_claim_interface error',
+                 'cb transfer status',
+                 'LIBUSB_ERROR',
+                 'Library error')
+
+# rtl_fm samples are queued this deep, the demodulator falling behind blocks
+# the reader (and rtl_fm drops samples, see create_source_monitor)
+RTL_FM_DEPTH = 4
+
+# run rtl_fm, the blocks of samples go to in_q as (array, size), None when it
+# is given up. CPython only (subprocess)
+# in_q must be bounded (eg. Queue(RTL_FM_DEPTH)), the blocks are a ring of
+# in_q.maxsize+2 preallocated arrays, reused once the consumer took the next
+# block. chunk_size samples are read at once and copied into the array as
+# they are (byteswapped on big endian hosts), no per sample python. u16
+# samples (stream_type) stay unsigned in array('H'), the consumer removes the
+# 32768 bias as for files. quiet channels are skipped by the demodulator
+# activity gate (fir_options 'gate'), frames across blocks are not cut
+# rtl_fm is supervised, when it exits, stalls (no samples for stall_secs) or
+# reports a device error it is restarted after backoff seconds, doubled on
+# each restart up to backoff_max (reset after a run that delivered samples).
+# the demodulator keeps running in between, it just gets no samples.
+# reset_cmd (eg. 'usbreset 0bda:2838') is run before restarting after a
+# device error
+# status (dict) is kept up to date, restarts, device_errors, downtime
+# (seconds without rtl_fm samples since the first start) and last_error
+async def read_samples_from_rtl_fm(in_q,
+                                   cmd          = RTL_FM_CMD,
+                                   stream_type  = 's16',        # rtl_fm writes s16
+                                   chunk_size   = SAMPLES_SIZE, # samples per read
+                                   stall_secs   = 10,
+                                   backoff      = 1,
+                                   backoff_max  = 60,
+                                   max_restarts = None,         # in a row before giving up, None never
+                                   reset_cmd    = None,
+                                   status       = None,
                                    ):
-    try:
-        stderr_task = None
-        try:
-            cmd = 'rtl_fm -f 144.390M -s 22050 -g 10'
-            proc = await asyncio.create_subprocess_exec(
-                cmd.split()[0], *cmd.split()[1:], 
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-
-            # process stderr messages separately from stdout
-            async def proc_stderr(stderr):
-                try:
-                    while True:
-                        stderr = await proc.stderr.readline()
-                        msg = stderr.decode().strip()
-                        if msg:
-                            eprint(msg)
-                            #if 'Failed to open rtlsdr device' in msg:
-                            #    os.system('usbreset 0bda:2838')
-                except Exception as err:
-                    print_exc(err)
-                except asyncio.CancelledError:
-                    raise
-            # stderr task
-            stderr_task = asyncio.create_task(proc_stderr(proc.stderr))
+    status = {} if status is None else status
+    status.update(restarts = 0, device_errors = 0, downtime = 0.0, last_error = None)
+    if in_q.maxsize <= 0:
+        raise Exception('in_q must be bounded, the sample arrays are reused')
+    nbytes = 2*chunk_size
+    swap = sys.byteorder == 'big'
+    typecode = 'h' if stream_type=='s16' else 'H'
+    # one array in the consumer, maxsize queued and the one being filled
+    ring = [array(typecode, bytes(nbytes)) for i in range(in_q.maxsize+2)]
+    views = [array_bytes(arr, 2) for arr in ring]
+    idx = 0
+    down_t = None # time.monotonic() rtl_fm went down, None while it delivers
 
-            arr = array('i',range(SAMPLES_SIZE))
-            idx = 0
+    # one rtl_fm process until it exits, stalls or reports a device error
+    # returns (why it ended, device errors reported, whether samples came)
+    async def run():
+        nonlocal down_t, idx
+        proc = await asyncio.create_subprocess_exec(
+            cmd.split()[0], *cmd.split()[1:],
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        errors = []
+        delivered = False
+
+        # process stderr messages separately from stdout
+        async def proc_stderr():
+            try:
+                while True:
+                    line = await proc.stderr.readline()
+                    if not line:
+                        break
+                    msg = line.decode(errors = 'replace').strip()
+                    if not msg:
+                        continue
+                    eprint(msg)
+                    if any(e in msg for e in RTL_FM_ERRORS):
+                        status['device_errors'] += 1
+                        status['last_error'] = msg
+                        errors.append(msg)
+                        # it may hang on a lost device, restart it now
+                        if proc.returncode is None:
+                            proc.kill()
+            except Exception as err:
+                print_exc(err)
+            except asyncio.CancelledError:
+                raise
+        stderr_task = asyncio.create_task(proc_stderr())
+        try:
             while True:
                 try:
-                    a = await proc.stdout.readexactly(2)
-                except EOFError:
-                    eprint('eof')
-                    break
-                #eprint(a)
-                # arr[idx] = unpack('<H', a)[0] - 32768
-                arr[idx] = int.from_bytes(a,'little',signed=False) - 32768
-                idx += 1
-                if idx%SAMPLES_SIZE == 0:
-                    if afsk_detector(arr,idx): #afsk signal detector
-                        await in_q.put((arr, idx))
-                        await asyncio.sleep(0)
-                        arr = array('i',range(SAMPLES_SIZE))
-                    idx = 0
-            await in_q.put((arr, idx))
-            await asyncio.sleep(0)
+                    b = await asyncio.wait_for(proc.stdout.readexactly(nbytes), stall_secs)
+                except asyncio.IncompleteReadError as err:
+                    b = err.partial # eof, the last whole samples
+                except asyncio.TimeoutError:
+                    return 'stalled', errors, delivered
+                n = len(b) & ~1
+                if n and down_t is not None:
+                    status['downtime'] += time.monotonic() - down_t
+                    down_t = None
+                    eprint('# RTL  up, {} restarts, {:.1f}s down'.format(status['restarts'], status['downtime']))
+                if n:
+                    delivered = True
+                    arr = ring[idx]
+                    views[idx][:n] = b[:n] if n < len(b) else b
+                    idx = (idx+1) % len(ring)
+                    if swap:
+                        arr.byteswap()
+                    await in_q.put((arr, n//2))
+                    await asyncio.sleep(0)
+                if n < nbytes:
+                    # stdout closed, let it exit and tell why on stderr
+                    try:
+                        await asyncio.wait_for(proc.wait(), 1)
+                    except asyncio.TimeoutError:
+                        pass
+                    return 'eof', errors, delivered
         finally:
-            eprint('killing rtl_fm process')
-            proc.kill()
+            if proc.returncode is None:
+                eprint('killing rtl_fm process')
+                proc.kill()
             await proc.wait()
+            # the rest of stderr (why it ended), eof once rtl_fm is gone
+            try:
+                await asyncio.wait_for(stderr_task, 1)
+            except asyncio.TimeoutError:
+                pass
 
+    try:
+        delay = backoff
+        fails = 0 # restarts in a row
+        while True:
+            why,errors,delivered = await run()
+            device_error = bool(errors)
+            if device_error:
+                why = 'device error ({})'.format(status['last_error'])
+            if down_t is None:
+                down_t = time.monotonic()
+            if delivered:
+                # it was up, not failing in a row
+                fails = 0
+                delay = backoff
+            if max_restarts is not None and fails >= max_restarts:
+                eprint('# RTL  {}, giving up after {} restarts'.format(why, status['restarts']))
+                break
+            fails += 1
+            status['restarts'] += 1
+            eprint('# RTL  {}, restart {} in {}s'.format(why, status['restarts'], delay))
+            if device_error and reset_cmd:
+                eprint('# RTL  {}'.format(reset_cmd))
+                try:
+                    reset = await asyncio.create_subprocess_exec(reset_cmd.split()[0], *reset_cmd.split()[1:])
+                    await reset.wait()
+                except Exception as err:
+                    # a failed reset must not stop the restarts
+                    print_exc(err)
+            await asyncio.sleep(delay)
+            delay = min(2*delay, backoff_max)
     except Exception as err:
         print_exc(err)
     except asyncio.CancelledError:
         raise
-    finally:
-        if stderr_task:
-            stderr_task.cancel()
-
+    if down_t is not None:
+        status['downtime'] += time.monotonic() - down_t
+    await in_q.put(None)
@@ -47,6 +47,7 @@ class AFSKModulator():
                                                   # afsks  = [2200, 1200],
         #nrzi converter
         self.nrzi = create_nrzi()
+        self.nrzi_level = 0 # last line level sent, see to_samples(nrzi=False)
 
     async def __aenter__(self):
         return self
@@ -76,13 +77,16 @@ class AFSKModulator():
 
     async def to_samples(self, afsk, #bytes
                                stop_bit,
+                               nrzi = True, # False, afsk is already nrzi coded
+                                            # eg. AX25.to_afsk(nrzi = afsk_mod.nrzi_level)
                                ):
         arr = array(self.arr_t, (0 for i in range(_AFSK_Q_SIZE)))
         idx = 0
 
         nrzi_dbg_i = 0
 
-        nrzi = self.nrzi
+        nrzi = self.nrzi if nrzi else None
+        b = self.nrzi_level
         _q_put = self._q.put
         # gen_samples = self.gen_baud_period_samples
         gen_samples = self.afsk_tone_gen
@@ -97,7 +101,10 @@ class AFSKModulator():
                                         stop_bit = stop_bit):
 
                 #convert nrzi
-                b = nrzi(b)
+                if nrzi:
+                    b = nrzi(b)
+                else:
+                    b = 1 if b else 0
 
                 if verbose:
                     nrzi_dbg_i += 1
@@ -115,6 +122,11 @@ class AFSKModulator():
 
             await _q_put((arr, idx))
 
+            # keep the nrzi converter in sync with the level we ended on
+            if not nrzi:
+                self.nrzi = create_nrzi(level = b)
+            self.nrzi_level = b
+
             if verbose:
                 eprint('\n')
         except Exception as err:
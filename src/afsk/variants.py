@@ -0,0 +1,323 @@
+
+# run several demodulator variants (fir option sets, see afsk.fir_options
+# fir_profiles) against the same input and merge the decoded frames
+#
+# each variant is a decoder (afsk.decoder) fed blocks of samples. on CPython
+# every variant runs in its own process, the input blocks are written once
+# into a shared memory ring that all the workers read. elsewhere (micropython)
+# the variants run one after the other on each block in this event loop.
+# frames decoded by more than one variant within dedup_window samples are
+# only output once, tagged (ax25.variant) with the first variant that decoded it
+
+import sys
+import time
+import asyncio
+from array import array
+
+from lib.compat import Queue
+from lib.compat import IS_UPY
+from lib.compat import print_exc
+from lib.compat import ticks_us
+from lib.compat import ticks_diff
+
+from afsk.decoder import AFSKDecoder
+from afsk.demod import create_stream_reader
+from afsk.ingress import create_source_monitor
+from afsk.fir_options import fir_profiles
+from ax25.ax25 import AX25
+
+class DemodVariant():
+    # one demodulator configuration, samples in, decoded ax25 frames out
+    def __init__(self, name,
+                       sampling_rate = 22050,
+                       is_hf         = False,
+                       options       = None, # fir options, default from fir_profiles[name]
+                       backend       = 'python',
+                       dsp_rate      = None,
+                       filter_engine = 'auto',
+                       soft_bits     = False,
+                       ):
+        self.name = name
+        if options is None:
+            options = fir_profiles[name]
+        self.decoder = AFSKDecoder(sampling_rate = sampling_rate,
+                                   is_hf         = is_hf,
+                                   options       = options,
+                                   backend       = backend,
+                                   dsp_rate      = dsp_rate,
+                                   filter_engine = filter_engine,
+                                   soft_bits     = soft_bits)
+
+    # process a block, returns the frames completed within it
+    async def process(self, arr, siz, bias = 0):
+        return self.decoder.decode(arr, siz, bias)
+
+class FrameDedup():
+    # drop frames already seen within window samples
+    # a frame that needed fixing is held back for window samples and dropped
+    # if another variant decoded a frame of the same length without fixing,
+    # most likely the same transmission that the fixer got wrong
+    def __init__(self, window):
+        self.window = window
+        self.seen  = {} # frame bytes -> sample position
+        self.clean = {} # frame length -> sample position of the last clean frame
+        self.held  = [] # (pos, key, item) fixed frames waiting
+
+    # returns the items ready for output
+    def push(self, key, pos, fixed, item):
+        out = self.release(pos)
+        last = self.seen.get(key)
+        if last is not None and pos - last <= self.window:
+            return out
+        self.seen[key] = pos
+        if len(self.seen) > 256:
+            self.seen = {k:p for k,p in self.seen.items() if pos - p <= self.window}
+        if fixed:
+            last = self.clean.get(len(key))
+            if last is None or pos - last > self.window:
+                self.held.append((pos, key, item))
+            return out
+        self.clean[len(key)] = pos
+        self.held = [h for h in self.held if len(h[1]) != len(key)]
+        return out + [item]
+
+    def release(self, pos = None):
+        # held frames older than window (all if pos is None)
+        # (variants finish blocks out of order, held is not sorted)
+        out = [h[2] for h in self.held if pos is None or pos - h[0] > self.window]
+        if out:
+            self.held = [h for h in self.held if not (pos is None or pos - h[0] > self.window)]
+        return out
+
+if not IS_UPY:
+    from multiprocessing import Process
+    from multiprocessing import Pipe
+    from multiprocessing.connection import wait
+    from multiprocessing.shared_memory import SharedMemory
+
+    def variant_worker(conn, shm_name, typecode, kw):
+        # worker process, runs one variant on the blocks in shared memory
+        shm = SharedMemory(name = shm_name)
+        try:
+            asyncio.run(variant_worker_core(conn, shm, typecode, kw))
+        finally:
+            shm.close()
+
+    async def variant_worker_core(conn, shm, typecode, kw):
+        buf = shm.buf.cast(typecode)
+        try:
+            variant = DemodVariant(**kw)
+            while True:
+                msg = conn.recv()
+                if msg is None:
+                    break
+                start,siz,bias = msg
+                frames = await variant.process(buf[start:start+siz], siz, bias)
+                # ax25 objects don't pickle, send the frames
+                conn.send([(bytes(f.to_frame()), f.fixed, f.start, f.end) for f in frames])
+        finally:
+            buf.release()
+            conn.close()
+
+    def recv_ready(conns, timeout = None):
+        # the results of the conns that have one, [(conn, result)], waits up
+        # to timeout (None until one has)
+        return [(conn, conn.recv()) for conn in wait(conns, timeout)]
+
+    class VariantPool():
+        # one process per variant, blocks go through a ring of slots in shared memory
+        def __init__(self, variants,      # list of DemodVariant kwargs
+                           typecode = 'h',
+                           chunk_size = 1024,
+                           slots    = 8,  # blocks in flight
+                           ):
+            self.names = [kw['name'] for kw in variants]
+            self.typecode = typecode
+            self.chunk_size = chunk_size
+            self.slots = slots
+            self.shm = SharedMemory(create = True, size = 2*chunk_size*slots)
+            self.buf = self.shm.buf.cast(typecode)
+            self.slot = 0
+            self.pending = [] # per variant, end sample positions of its blocks in flight, oldest first
+            self.conns = []
+            self.procs = []
+            for kw in variants:
+                a,b = Pipe()
+                p = Process(target = variant_worker,
+                            args   = (b, self.shm.name, typecode, kw),
+                            daemon = True)
+                p.start()
+                self.conns.append(a)
+                self.procs.append(p)
+                self.pending.append([])
+
+        # submit a block, returns [(end, name, [frames])] of the blocks completed
+        async def submit(self, arr, siz, end, bias = 0):
+            done = await self.collect(block = False)
+            # the slot is free once every variant is done with its block
+            while max(len(q) for q in self.pending) == self.slots:
+                done.extend(await self.collect())
+            start = self.slot*self.chunk_size
+            self.buf[start:start+siz] = arr[:siz]
+            for conn,q in zip(self.conns, self.pending):
+                conn.send((start, siz, bias))
+                q.append(end)
+            self.slot = (self.slot + 1) % self.slots
+            return done
+
+        # results of the variants done with a block, as soon as any is (or
+        # those already done if not block), a slow variant doesn't hold back
+        # the others
+        async def collect(self, block = True):
+            busy = [conn for conn,q in zip(self.conns, self.pending) if q]
+            if not busy:
+                return []
+            if block:
+                ready = await asyncio.to_thread(recv_ready, busy)
+            else:
+                ready = recv_ready(busy, 0)
+            done = []
+            for conn,res in ready:
+                v = self.conns.index(conn)
+                end = self.pending[v].pop(0)
+                frames = []
+                for f,fixed,start,end_ in res:
+                    ax25 = AX25(frame = f)
+                    ax25.fixed = fixed
+                    ax25.start = start
+                    ax25.end = end_
+                    frames.append(ax25)
+                done.append((end, self.names[v], frames))
+            return done
+
+        async def flush(self):
+            done = []
+            while any(self.pending):
+                done.extend(await self.collect())
+            return done
+
+        def close(self):
+            for conn in self.conns:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+            for p in self.procs:
+                p.join(timeout = 1)
+                if p.is_alive():
+                    p.terminate()
+            self.buf.release()
+            self.shm.close()
+            self.shm.unlink()
+
+async def multi_demod(in_rx,  # stream, Queue of arrays (array, size) (None ends it) or buffer of samples
+                      ax25_q, # merged, deduplicated output
+                      profiles,
+                      sampling_rate = 22050,
+                      is_hf         = False,
+                      stream_type   = 's16',
+                      backend       = 'python',
+                      dsp_rate      = None,
+                      filter_engine = 'auto',
+                      soft_bits     = False,
+                      chunk_size    = 1024,
+                      dedup_window  = None,  # samples, default 1 second
+                      processes     = not IS_UPY,
+                      live          = False, # set ax25.time and account the source, see AFSKDecoder.run
+                      ):
+    try:
+        variants = [dict(name          = name,
+                         sampling_rate = sampling_rate,
+                         is_hf         = is_hf,
+                         backend       = backend,
+                         dsp_rate      = dsp_rate,
+                         filter_engine = filter_engine,
+                         soft_bits     = soft_bits) for name in profiles]
+        dedup = FrameDedup(dedup_window or sampling_rate)
+        typecode = 'h' if stream_type=='s16' else 'H'
+        bias = 0 if stream_type=='s16' else 32768
+
+        # buffer of samples, eg. mmap'd by afsk.ingress.open_samples
+        is_buf = not (isinstance(in_rx, Queue) or hasattr(in_rx, 'readinto') or hasattr(in_rx, 'read'))
+        if is_buf:
+            pos = 0
+        elif not isinstance(in_rx, Queue):
+            arr = array(typecode, (0 for x in range(chunk_size)))
+            read_block = create_stream_reader(in_rx, arr)
+
+        async def emit(done):
+            now = time.time()
+            for end,name,frames in done:
+                for ax25 in frames:
+                    ax25.variant = name
+                    if live and ax25.end is not None:
+                        # the last sample submitted was sampled just now
+                        ax25.time = now - (submitted - ax25.end)/sampling_rate
+                    # dedup by where the frame ended, blocks end anywhere
+                    at = ax25.end if ax25.end is not None else end
+                    for out in dedup.push(bytes(ax25.to_frame()), at, ax25.fixed, ax25):
+                        await ax25_q.put(out)
+
+        if processes:
+            # design (and memoize) the filters here once, workers designing
+            # them would race writing lib/memoizedat.py
+            for kw in variants:
+                DemodVariant(**kw)
+            pool = VariantPool(variants, typecode = typecode, chunk_size = chunk_size)
+        else:
+            pool = None
+            runs = [DemodVariant(**kw) for kw in variants]
+
+        monitor = create_source_monitor(sampling_rate) if live else None
+        try:
+            end = 0
+            submitted = 0
+            while True:
+                t = ticks_us()
+                if isinstance(in_rx, Queue):
+                    arr_siz = await in_rx.get()
+                    if arr_siz is None:
+                        in_rx.task_done()
+                        break
+                    if isinstance(arr_siz, tuple) and len(arr_siz)==2:
+                        blk,siz = arr_siz
+                    else:
+                        blk = arr_siz
+                        siz = len(blk)
+                    in_rx.task_done()
+                elif is_buf:
+                    blk = in_rx[pos:pos+chunk_size]
+                    siz = len(blk)
+                    pos += siz
+                    if not siz:
+                        break
+                else:
+                    siz = await read_block()
+                    if not siz:
+                        break
+                    blk = arr
+                t1 = ticks_us()
+                # split into chunk_size blocks
+                for i in range(0, siz, chunk_size):
+                    n = min(chunk_size, siz-i)
+                    sub = blk[i:i+n] if i or n != siz else blk
+                    end += n
+                    submitted = end
+                    if pool:
+                        await emit(await pool.submit(sub, n, end, bias))
+                    else:
+                        await emit([(end, v.name, await v.process(sub, n, bias)) for v in runs])
+                if monitor:
+                    monitor(siz, ticks_diff(t1, t)/1e6, ticks_diff(ticks_us(), t1)/1e6)
+                await asyncio.sleep(0)
+            if pool:
+                await emit(await pool.flush())
+            for ax25 in dedup.release():
+                await ax25_q.put(ax25)
+        finally:
+            if pool:
+                pool.close()
+    except asyncio.CancelledError:
+        raise
+    except Exception as err:
+        print_exc()
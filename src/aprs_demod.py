@@ -5,8 +5,8 @@ import asyncio
 
 from lib.compat import Queue
 
-from afsk.demod import AFSKDemodulator
-from ax25.from_afsk import AX25FromAFSK
+from afsk.decoder import AFSKDecoder
+from afsk.demod import memoized_dsp_rate
 
 import lib.upydash as _
 from lib.parse_args import demod_parse_args
@@ -17,21 +17,33 @@ from lib.compat import print_exc
 from lib.compat import get_stdin_streamreader
 
 from afsk.ingress import read_samples_from_rtl_fm
+from afsk.ingress import RTL_FM_DEPTH
+from afsk.ingress import open_samples
+from afsk.variants import multi_demod
 # from afsk.ingress import read_samples_from_file
 
 async def consume_ax25(ax25_q, 
                        is_quite = False, # suppress stdout
+                       offsets  = False, # sample positions (and time) of the frames
                        ):
     try:
         count = 1
         while True:
             ax25 = await ax25_q.get()
             if not is_quite:
+                pre = ''
+                if offsets and ax25.start is not None:
+                    pre = '{}-{} '.format(ax25.start, ax25.end)
+                    if ax25.time is not None:
+                        pre += '@{:.3f} '.format(ax25.time)
                 try:
-                    sys.stdout.write('[{}] {}\n'.format(count, ax25))
+                    sys.stdout.write('[{}] {}{}\n'.format(count, pre, ax25))
                 except: #UnicodeDecodeError:
                     sys.stdout.write('[{}] ERR\n'.format(count))
                 sys.stdout.flush()
+                if hasattr(ax25, 'variant'):
+                    # multiple demodulator variants, which one decoded it
+                    eprint('# [{}] {}'.format(count, ax25.variant))
             count += 1
             ax25_q.task_done()
             await asyncio.sleep(0)
@@ -41,34 +53,60 @@ async def consume_ax25(ax25_q,
         print_exc()
 
 async def demod_core(in_rx,
-                     bits_q,
                      ax25_q,
                      args,
                      ):
     try:
-        #AFSK Demodulation - convert analog samples to bits
+        #AFSK demodulation and AX25 deframing in one pass over each block
         #in_rx consumer
-        #bits_q producer
-        async with AFSKDemodulator(sampling_rate = args['args']['rate'],
-                                   is_hf         = args['args']['hf'],
-                                   in_rx         = in_rx,
-                                   bits_out_q    = bits_q,
-                                   stream_type   = args['in']['type'],
-                                   verbose       = args['args']['verbose'],
-                                   options       = args['args']['options'],
-                                   ) as afsk_demod:
-                                   # debug_samples = args['args']['debug_samples'],
-            # AX25FromAFSK - convert bits to ax25 objects
-            #bits_q consumer
-            #ax25_q producer
-            async with AX25FromAFSK(bits_in_q   = bits_q,
-                                    ax25_q      = ax25_q,
-                                    verbose     = args['args']['verbose']) as bits2ax25:
-
-                #flush afsk_demod filters
-                # await in_rx.put((array('i',(0 for x in range(afsk_demod.flush_size))),afsk_demod.flush_size))
-                
-                await afsk_demod.join()
+        #ax25_q producer
+        decoder = AFSKDecoder(sampling_rate = args['args']['rate'],
+                              is_hf         = args['args']['hf'],
+                              options       = args['args']['options'],
+                              backend       = args['args']['backend'],
+                              dsp_rate      = args['args']['dsp_rate'],
+                              filter_engine = args['args']['filter_engine'],
+                              soft_bits     = args['args']['soft'],
+                              verbose       = args['args']['verbose'],
+                              # time one block in 16, the counters cover them all
+                              stats_every   = 16 if args['args']['stats'] or args['args']['stats_file'] else 0,
+                              stats_secs    = args['args']['stats'] or 10,
+                              stats_file    = args['args']['stats_file'],
+                              )
+        await decoder.run(in_rx, ax25_q,
+                          stream_type = args['in']['type'],
+                          live        = args['in']['file'] in ('-', 'rtl_fm'))
+
+        if args['args']['verbose']:
+            eprint('# FIX  {}'.format(decoder.fix_stats))
+    except asyncio.CancelledError:
+        raise
+    except Exception as err:
+        print_exc()
+
+async def chunked_core(path,
+                       ax25_q,
+                       args,
+                       ):
+    try:
+        # file split in chunks decoded by a pool of processes, frames in order
+        from afsk.chunked import iter_frames_chunked
+        it = iter_frames_chunked(path,
+                                 rate          = args['args']['rate'],
+                                 jobs          = args['args']['jobs'] or None,
+                                 options       = args['args']['options'],
+                                 stream_type   = args['in']['type'],
+                                 is_hf         = args['args']['hf'],
+                                 backend       = args['args']['backend'],
+                                 dsp_rate      = args['args']['dsp_rate'],
+                                 filter_engine = args['args']['filter_engine'],
+                                 soft_bits     = args['args']['soft'],
+                                 )
+        while True:
+            f = await asyncio.to_thread(next, it, None)
+            if f is None:
+                break
+            await ax25_q.put(f.ax25)
     except asyncio.CancelledError:
         raise
     except Exception as err:
@@ -78,11 +116,15 @@ async def main():
     args = demod_parse_args(sys.argv)
     eprint('# APRS DEMOD')
     eprint('# RATE {}'.format(args['args']['rate']))
+    if args['args']['dsp_rate']:
+        eprint('# DSPR {}'.format(args['args']['dsp_rate']))
+    eprint('# DSP  {}'.format(args['args']['backend']))
+    if args['args']['profiles']:
+        eprint('# VARS {}'.format(','.join(args['args']['profiles'])))
     eprint('# IN   {} ({})'.format(args['in']['file'], args['in']['type']))
     eprint('# OUT  {} (ax25)'.format(args['out']['file']))
     # eprint(sys.argv)
 
-    bits_q = Queue()
     ax25_q = Queue()
 
     try:
@@ -91,25 +133,62 @@ async def main():
 
         #create ax25 consumer
         tasks.append(asyncio.create_task(consume_ax25(ax25_q   = ax25_q,
-                                                      is_quite = args['args']['debug_samples']), # no output when debugging samples
+                                                      is_quite = args['args']['debug_samples'], # no output when debugging samples
+                                                      offsets  = args['args']['offsets']),
                                         ))
 
-        #from .raw file
+        #from .raw or .wav file
         if args['in']['file'] == '-':
             in_rx = await get_stdin_streamreader()
-        elif args['in']['file']:
-            in_rx = open(args['in']['file'], 'rb')
         elif args['in']['file'] == 'rtl_fm':
-            in_rx = Queue()
-            await read_samples_from_rtl_fm(in_rx)
+            # blocks of samples, rtl_fm is restarted when it fails (None
+            # if given up). mostly idle channel, gate the demodulator unless
+            # the options say otherwise
+            args['args']['options'].setdefault('gate', True)
+            in_rx = Queue(RTL_FM_DEPTH)
+            usbreset = args['args']['usbreset']
+            tasks.append(asyncio.create_task(read_samples_from_rtl_fm(in_rx,
+                                                                      stream_type = args['in']['type'],
+                                                                      reset_cmd   = usbreset and 'usbreset {}'.format(usbreset))))
+        elif args['in']['file']:
+            in_rx,rate,channels = open_samples(args['in']['file'], args['in']['type'])
+            if rate:
+                # wav, the header has the rate, samples are s16
+                eprint('# WAV  {} Hz, {} channel(s)'.format(rate, channels))
+                args['args']['rate'] = rate
+                args['in']['type'] = 's16'
+                if not args['args']['dsp_rate']:
+                    # no scipy needed for eg. 44100 Hz recordings, resampled
+                    # to a rate with memoized filters unless --dsp_rate says
+                    args['args']['dsp_rate'] = memoized_dsp_rate(rate)
+                    if args['args']['dsp_rate']:
+                        eprint('# DSPR {} (no memoized filters at {} Hz, --dsp_rate to override)'.format(
+                               args['args']['dsp_rate'], rate))
         else:
             raise Exception('unsupported input {}'.format(args['in']['file']))
 
         # DEMOD CORE
-        await demod_core(in_rx, bits_q, ax25_q, args)
+        if args['args']['jobs'] is not None and args['in']['file'] not in ('-', 'rtl_fm'):
+            eprint('# JOBS {}'.format(args['args']['jobs'] or 'all cores'))
+            await chunked_core(args['in']['file'], ax25_q, args)
+        elif args['args']['profiles']:
+            await multi_demod(in_rx         = in_rx,
+                              ax25_q        = ax25_q,
+                              profiles      = args['args']['profiles'],
+                              sampling_rate = args['args']['rate'],
+                              is_hf         = args['args']['hf'],
+                              stream_type   = args['in']['type'],
+                              backend       = args['args']['backend'],
+                              dsp_rate      = args['args']['dsp_rate'],
+                              filter_engine = args['args']['filter_engine'],
+                              soft_bits     = args['args']['soft'],
+                              processes     = not args['args']['inproc'],
+                              live          = args['in']['file'] in ('-', 'rtl_fm'),
+                              )
+        else:
+            await demod_core(in_rx, ax25_q, args)
                             
         # wait until queues are done
-        await bits_q.join()
         await ax25_q.join()
 
     except Exception as err:
@@ -94,9 +94,6 @@ async def afsk_mod(aprs_q,
                     eprint('--ax25--')
                     pretty_binary(ax25.to_frame())
 
-                # AFSK
-                afsk,stop_bit = ax25.to_afsk()
-
                 await afsk_mod.pad_zeros(10)
                 
 				# pre-message flags
@@ -107,9 +104,13 @@ async def afsk_mod(aprs_q,
                     await afsk_mod.send_flags(4)
                 # await afsk_mod.send_flags(4)
 
+                # AFSK, nrzi coded from the level the flags ended on
+                afsk,stop_bit = ax25.to_afsk(nrzi = afsk_mod.nrzi_level)
+
                 # generate samples
                 await afsk_mod.to_samples(afsk     = afsk, 
                                           stop_bit = stop_bit,
+                                          nrzi     = False,
                                           )
                 # send post message flags
                 # multimon-ng and direwolf want one additional post flag in addition to the one at the end
@@ -14,7 +14,7 @@ from ax25.defs import CallSSIDError
 from ax25.callssid import CallSSID
 from ax25.func import reverse_bit_order
 from ax25.func import convert_nrzi
-from ax25.func import do_bitstuffing
+from ax25.func import line_encode
 
 import lib.upydash as _
 from lib.crc16 import crc16_ccit
@@ -49,6 +49,7 @@ class AX25():
                        info       = b'',
                        aprs       = None,
                        frame      = None,
+                       fcs_ok     = None,
                        verbose    = False,
                        ):
         self.verbose = verbose
@@ -58,10 +59,16 @@ class AX25():
         #   2) By APRS message, eg. M0XER-4>APRS64,TF3RPF,WIDE2*,qAR,TF3SUT-2:!/.(M4I^C,O `DXa/A=040849|#B>@\"v90!+|
         #   3) By ax25 frame bytes
         self._frame = None
+        self.fixed = 0 # number of bits the fixer flipped to decode this frame
+        # demodulated frames, input sample positions of the opening/closing
+        # flags and wall clock time (time.time()) of the closing flag for live inputs
+        self.start = None
+        self.end = None
+        self.time = None
         self.src = None
         self.dst = None
         if frame != None:
-            self.from_frame(frame = frame)
+            self.from_frame(frame = frame, fcs_ok = fcs_ok)
         elif aprs != None:
             self.from_aprs(aprs = aprs)
         else:
@@ -142,11 +149,13 @@ class AX25():
         # self.info = aprs[i+1:].encode()
 
 
-    def from_frame(self, frame):
+    def from_frame(self, frame, fcs_ok = None):
         # from bytearray to ax25 structure
         # this function is AFTER unNRZI, unstuffing, reversed
         # the BitStreamToAX25 handles that, this  function
         # only maps bytes to their field structure
+        # fcs_ok: None, compute the crc here
+        #         True/False, the crc was already checked (streaming hdlc receiver)
 
         mv = memoryview(frame)
         if len(mv) < 3:
@@ -189,14 +198,17 @@ class AX25():
         idx += 2
 
         #crc
-        crc  = bytes(mv[stop_idx-2:stop_idx])
-        _crc = struct.pack('<H',crc16_ccit(mv[start_idx:stop_idx-2]))
-        if crc != _crc:
+        if fcs_ok is None:
+            crc  = bytes(mv[stop_idx-2:stop_idx])
+            _crc = struct.pack('<H',crc16_ccit(mv[start_idx:stop_idx-2]))
+            fcs_ok = crc == _crc
+        if not fcs_ok:
             raise DecodeErrorFix(self)
 
         #if crc passes assign info, minimize assignment
-        if crc == _crc:
-            self.info = bytes(mv[idx:stop_idx-2])
+        self.info = bytes(mv[idx:stop_idx-2])
+        # the received frame, eg. to send it to another process
+        self._frame = bytes(mv[:stop_idx+1])
 
     @property
     def frame(self):
@@ -276,35 +288,26 @@ class AX25():
 
     def to_afsk(self, flags_pre        = 1, # number of pre-flags
                       flags_post       = 1, # number of post-flags
+                      nrzi             = None, # None, or nrzi code from this level (0/1)
                       ):
         # everything in to_ax25, but also
         # reverse bit order
         # stuff bits
+        # (optionally) nrzi
         # ready to afsk out
 
-        bit_stuff_margin = 8
-        frame = self.to_frame(bit_stuff_margin = bit_stuff_margin,
-                              flags_pre        = flags_pre, # number of pre-flags
+        frame = self.to_frame(flags_pre        = flags_pre, # number of pre-flags
                               flags_post       = flags_post, # number of post-flags
                               )
-        mv = memoryview(frame)
-        stop_bit = (len(frame)-bit_stuff_margin) * 8
 
-        #revese bit order
-        reverse_bit_order(mv)
-        if self.verbose:
-            eprint('-reversed-')
-            pretty_binary(mv)
-
-        # stuff bits in place
-        # update the total number of bits
-        stuff_cnt = do_bitstuffing(mv, 
-                                   start_bit = flags_pre*_AX25_FLAG_LEN*8, 
-                                   stop_bit  = stop_bit - flags_post*_AX25_FLAG_LEN*8)
-        stop_bit += stuff_cnt
+        # single pass, reverse bit order, stuff bits (and nrzi)
+        frame,stop_bit = line_encode(frame,
+                                     flags_pre  = flags_pre,
+                                     flags_post = flags_post,
+                                     nrzi       = nrzi)
         if self.verbose:
-            eprint('-bit stuffed-')
-            pretty_binary(mv)
+            eprint('-reversed/bit stuffed-')
+            pretty_binary(memoryview(frame))
 
         return (frame,stop_bit)
 
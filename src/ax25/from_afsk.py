@@ -8,20 +8,26 @@ from array import array
 # from asyncio import Queue
 
 from ax25.ax25 import AX25
-from ax25.func import reverse_bit_order
-from ax25.func import trim_frame
-from ax25.func import unstuff
+from ax25.func import create_hdlc_rx
+from ax25.func import fcs_locate_1
+from ax25.func import fcs_locate_2
+from ax25.func import AX25_FCS_RESIDUE
 from ax25.defs import DecodeError
 from ax25.defs import DecodeErrorNoFix
 from ax25.defs import DecodeErrorFix
 
 import lib.upydash as _
 from lib.utils import pretty_binary
-from lib.utils import int_div_ceil
-from lib.utils import assign_bit
 from lib.utils import eprint
 
+from lib.crc16 import crc16_ccit
+
 from lib.compat import print_exc
+from lib.compat import ticks_ms
+from lib.compat import ticks_us
+from lib.compat import ticks_diff
+from lib.stats import new_stages
+from lib.stats import stage_add
 
 AX25_FLAG      = 0x7e
 AX25_ADDR_LEN  = 7
@@ -31,16 +37,54 @@ class AX25FromAFSK():
     def __init__(self, bits_in_q,
                        ax25_q,
                        ax25_crc_err_q = None,
+                       fix_budget_ms  = 100,   # max time spent fixing a frame
+                       fix_soft_bits  = 32,    # soft bits, only flip bits among the n least confident of the frame
+                       stats_every    = 0,     # instrumentation, time the hdlc receiver on one chunk in stats_every, 0 off
                        verbose        = False):
         self.bits_q = bits_in_q
         self.ax25_q = ax25_q
         self.ax25_crc_err_q = ax25_crc_err_q
+        self.fix_budget_ms = fix_budget_ms
+        self.fix_soft_bits = fix_soft_bits
         self.verbose = verbose
 
+        # fixer counters
+        #   attempts   frames with a bad fcs we tried fixing
+        #   candidates error patterns tried
+        #   fixed_1/2  frames fixed with 1/2 bit errors
+        #   timeouts   frames that ran out of fix_budget_ms
+        self.fix_stats = {'attempts'   : 0,
+                          'candidates' : 0,
+                          'fixed_1'    : 0,
+                          'fixed_2'    : 0,
+                          'timeouts'   : 0}
+
+        # instrumentation (lib.stats), counters of all the chunks
+        #   chunks, bits  chunks and bits in
+        #   frames        frames between flags, decoding attempted
+        #   fcs_ok        of which with a good fcs
+        #   decoded       frames out, fixed included
+        # the frames of the timed chunks are timed too (decode, fixer included)
+        self.stats_every = stats_every
+        self.stats_n = 0
+        self.stats = None
+        if stats_every:
+            self.stats = {'chunks'  : 0,
+                          'bits'    : 0,
+                          'frames'  : 0,
+                          'fcs_ok'  : 0,
+                          'decoded' : 0,
+                          'stages'  : new_stages(('hdlc', 'decode'))}
+
+        self.hdlc_rx = create_hdlc_rx(min_len = AX25_MIN_BITS//8-2)
+
         # self.frames_q = Queue()
         self.tasks = []
 
     async def __aenter__(self):
+        if not self.bits_q:
+            # deframe() called directly
+            return self
         self.tasks.append(asyncio.create_task(self.delimin_coro()))
         return self
 
@@ -49,134 +93,159 @@ class AX25FromAFSK():
         await asyncio.gather(*self.tasks, return_exceptions=True)
 
     async def delimin_coro(self):
-        # We receive a stream of 1s and 0s from bits_q, this function
-        # will find/chunk the bitstream delminiated by the AX25 flags
-        # output: (bytearray, num_bits) is sent to frame_q
+        # We receive a stream of 1s and 0s from bits_q, the hdlc receiver
+        # finds the frames delimited by the AX25 flags, unstuffs, reverses
+        # and checks the fcs as the bits arrive
+        # bits_q items are chunks (bits, nbits), one bit per byte, or single bits
+        # soft bits chunks (bits, nbits, confs) carry a confidence per bit for the fixer
+        # AFSKDemodulator chunks (bits, nbits, confs, pos) also the input sample position
+        # of each bit, the frames get the positions of their flags (ax25.start/end)
+        # output: complete frames are decoded and sent to ax25_q
         try:
-            inbsize = 2024
-            inb = bytearray(inbsize)
-            mv = memoryview(inb)
-            idx = 0
-            flgcnt = 0
             while True:
-                b = await self.bits_q.get()
-                inb[idx//8] = assign_bit(inb[idx//8], idx, b)
-                idx += 1
-                if b == 0 and flgcnt == 6:
-                    #detected ax25 frame flag
-                    #a valid AX25 frame is at minimum 160 bites (20 bytes) long
-                    if idx >= AX25_MIN_BITS:
-                        if self.verbose:
-                            eprint('frame')
-                        # eprint('frame')
-                        await self.frame_to_ax25(bytearray(mv[:int_div_ceil(idx,8)]), idx)
-                    mv[0] = AX25_FLAG #keep the frame flag that we detected in buffer
-                    idx = 8
-                flgcnt = flgcnt + 1 if b else 0
-                if idx == inbsize:
-                    idx = 0
+                bits = await self.bits_q.get()
+                confs = None
+                pos = None
+                if isinstance(bits, int):
+                    bits,nbits = (bits,),1
+                elif len(bits) == 4:
+                    bits,nbits,confs,pos = bits
+                elif len(bits) == 3:
+                    bits,nbits,confs = bits
+                else:
+                    bits,nbits = bits
+                for ax25 in self.deframe(bits, nbits, confs, pos):
+                    await self.ax25_q.put(ax25)
                 self.bits_q.task_done()
         except Exception as err:
             print_exc()
 
-    async def frame_to_ax25(self, buf, stop_bit):
-        mv = memoryview(buf)
-        if self.verbose:
-            print('===== DEMOD frame ======')
-            pretty_binary(mv)
-
-        #unstuff
-        unstuff(mv, stop_bit)
-        if self.verbose:
-            print('-un-stuffed-')
-            pretty_binary(mv)
+    def deframe(self, bits, nbits, confs = None, pos = None):
+        # a chunk of bits (and soft bits confidences, bit positions) in, no
+        # queues, returns the frames completed in it as AX25 objects
+        stats = self.stats
+        t = None
+        if stats is not None:
+            stats['chunks'] += 1
+            stats['bits'] += nbits
+            self.stats_n += 1
+            if self.stats_n >= self.stats_every:
+                self.stats_n = 0
+                t = ticks_us()
+        out = []
+        frames = self.hdlc_rx(bits, nbits, confs, pos)
+        if t is not None:
+            stage_add(stats['stages']['hdlc'], 1, nbits, t)
+        for frame,fcs_ok,conf,start,end in frames:
+            if self.verbose:
+                eprint('frame')
+            if stats is not None:
+                stats['frames'] += 1
+                stats['fcs_ok'] += 1 if fcs_ok else 0
+                if t is not None:
+                    t = ticks_us()
+            ax25 = self.decode_frame(frame, fcs_ok, conf)
+            if stats is not None:
+                if t is not None:
+                    stage_add(stats['stages']['decode'], 1, len(frame), t)
+                stats['decoded'] += 1 if ax25 else 0
+            if ax25:
+                ax25.start = start
+                ax25.end = end
+                out.append(ax25)
+        return out
+
+    async def frame_to_ax25(self, buf, fcs_ok = None, conf = None):
+        ax25 = self.decode_frame(buf, fcs_ok, conf)
+        if ax25:
+            await self.ax25_q.put(ax25)
 
-        #reverse bit order
-        reverse_bit_order(mv)
-        # mv = trim_frame(mv)
+    def decode_frame(self, buf, fcs_ok = None, conf = None):
+        # buf is already unstuffed and reversed, fcs_ok from the hdlc receiver
+        # conf, soft bits confidence of each data bit (or None)
+        # returns the AX25 object, fixed if needed, or None
+        mv = memoryview(buf)
         if self.verbose:
-            print('-un-reversed (ax25)-')
+            print('===== DEMOD frame (ax25) ======')
             pretty_binary(mv)
 
         #decode
         try:
-            ax25 = AX25(frame = mv)
-            await self.ax25_q.put(ax25)
-            return
+            return AX25(frame = mv, fcs_ok = fcs_ok)
         except DecodeErrorNoFix as err:
             return
         except DecodeErrorFix as err:
             _ax25 = err.ax25
 
-        #try fixing src/dst
-        ax25 = self.fixer_src_dst(mv = mv)
-        if ax25:
-            await self.ax25_q.put(ax25)
-            return
-
-        #no src/dst, don't bother additional fixing
-        #this way we avoid trying to fix messages that have no chance of fixing
-        if not (_ax25.src and _ax25.src.is_valid()) or\
-           not (_ax25.dst and _ax25.dst.is_valid()):
-            return
-
-        #try fixing info/rest of message
-        ax25 = self.fixer_info(mv = mv)
-        if ax25:
-            await self.ax25_q.put(ax25)
-            return
-
-        return
-
-    def fixer_src_dst(self, mv):
-
-        flip = self.flip
-        lbits = 8*len(mv)
-
-        #try fixing src/dst
-        # print(1)
-        for flip_a in range(8,8+8*(AX25_ADDR_LEN*2)):
-            for flip_b in range(flip_a,8+8*(AX25_ADDR_LEN*2)):
-                if flip_a >= lbits or flip_b >= lbits:
-                    continue
-                try:
-                    flip(mv, flip_a, flip_b)
-                    ax25 = AX25(frame = mv)
-                    if ax25.src.is_valid() and ax25.dst.is_valid():
-                        # print('FIXED src/dst')
-                        return ax25
-                    else:
-                        flip(mv, flip_a, flip_b)
-                except DecodeErrorFix as err:
-                    pass
-                flip(mv, flip_a, flip_b)
-
-
-    def fixer_info(self, mv):
-
-        flip = self.flip
-        lbits = 8*len(mv)
-
-        #try fixing rest of message
-        for flip_a in range(8+8*(AX25_ADDR_LEN*2), 8*(len(mv)-3)):
-            for flip_b in range(flip_a,8*(len(mv)-3)):
-                if flip_a >= lbits or flip_b >= lbits:
-                    continue
-                try:
-                    flip(mv, flip_a, flip_b)
-                    ax25 = AX25(frame = mv)
-                    # print('FIXED info')
+        return self.fixer(mv = mv, _ax25 = _ax25, conf = conf)
+
+    def fixer(self, mv, _ax25, conf = None):
+        # locate 1 and 2 bit errors from the fcs syndrome instead of trying
+        # every flip, same search order as the brute force fixers had:
+        #   single bit errors
+        #   2 bit errors in src/dst, src/dst must come out valid
+        #   2 bit errors in the rest of the message, if src/dst are already valid
+        # with soft bits (conf) only bits among the fix_soft_bits least confident
+        # are flipped, the 2 bit candidates are tried least confident first
+        stats = self.fix_stats
+        stats['attempts'] += 1
+        t = ticks_ms()
+
+        data  = mv[1:len(mv)-1] # no flags, fcs included
+        nbits = 8*len(data)
+        lsd   = 8*2*AX25_ADDR_LEN # src/dst
+        syndrome = crc16_ccit(data) ^ 0xffff ^ AX25_FCS_RESIDUE
+        if conf:
+            # confidence of the fix_soft_bits-th least confident bit
+            thr = sorted(conf)[min(self.fix_soft_bits, len(conf))-1]
+
+        p = fcs_locate_1(syndrome, nbits)
+        if p is not None:
+            if conf and conf[p] > thr:
+                return
+            ax25 = self.fix_try(mv, (p,), True)
+            if ax25:
+                stats['fixed_1'] += 1
+            return ax25
+
+        for lo,hi,valid in ((0, lsd, True),
+                            (lsd, nbits-16, False)):
+            if not valid:
+                #no src/dst, don't bother additional fixing
+                #this way we avoid trying to fix messages that have no chance of fixing
+                if not (_ax25.src and _ax25.src.is_valid()) or\
+                   not (_ax25.dst and _ax25.dst.is_valid()):
+                    return
+            # brute force order, bits MSB first within a byte
+            errs = fcs_locate_2(syndrome, nbits, lo, hi)
+            if conf:
+                errs = [e for e in errs if conf[e[0]] <= thr and conf[e[1]] <= thr]
+                errs.sort(key = lambda e: (max(conf[e[0]], conf[e[1]]), conf[e[0]] + conf[e[1]]))
+            else:
+                errs.sort(key = lambda e: sorted(((e[0]|7)-(e[0]&7), (e[1]|7)-(e[1]&7))))
+            for e in errs:
+                if ticks_diff(ticks_ms(), t) > self.fix_budget_ms:
+                    stats['timeouts'] += 1
+                    return
+                ax25 = self.fix_try(mv, e, valid)
+                if ax25:
+                    stats['fixed_2'] += 1
                     return ax25
-                except DecodeErrorFix as err:
-                    pass
-                flip(mv, flip_a, flip_b)
-
-    def flip(self, frame, flip_a, flip_b):
-        idx = flip_a//8
-        bit = flip_a%8
-        frame[idx] = frame[idx] ^ (0x80>>bit)
-        if flip_a != flip_b:
-            idx = flip_b//8
-            bit = flip_b%8
-            frame[idx] = frame[idx] ^ (0x80>>bit)
 
+    def fix_try(self, mv, errs, valid):
+        # flip the error bits, decode, undo if it doesn't
+        self.fix_stats['candidates'] += 1
+        self.flip(mv, errs)
+        try:
+            ax25 = AX25(frame = mv, fcs_ok = True)
+            if not valid or ax25.src.is_valid() and ax25.dst.is_valid():
+                ax25.fixed = len(errs)
+                return ax25
+        except DecodeErrorFix as err:
+            pass
+        self.flip(mv, errs)
+
+    def flip(self, frame, errs):
+        # data bit positions, frame starts with a flag
+        for p in errs:
+            frame[1+p//8] ^= 1<<(p%8)
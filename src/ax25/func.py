@@ -1,5 +1,9 @@
+from array import array
+
+from lib.crc16 import CRC16_AX25
 
 AX25_FLAG      = 0x7e
+AX25_FCS_RESIDUE = 0xf0b8 # crc register after data + fcs of a valid frame
 
 def assign_bit(byte, idx, value):
     mask = (0x80>>(idx%8))
@@ -18,6 +22,49 @@ def reverse_byte(_byte):
     _byte = ((_byte & 0x0F) << 4) | ((_byte & 0xF0) >> 4);
     return _byte
 
+# crc-16/x.25 syndromes of single bit errors, by distance of the bit from the
+# end of the fcs. the crc is linear, the syndrome of a frame (fcs residue ^
+# AX25_FCS_RESIDUE) is the xor of the syndromes of its bit errors, whatever the
+# data, so one table serves every frame length. grown on demand
+_fcs_syn     = array('H')
+_fcs_syn_idx = {} # syndrome -> distance
+def fcs_syndromes(nbits):
+    syn = _fcs_syn
+    idx = _fcs_syn_idx
+    while len(syn) < nbits:
+        if syn:
+            s = syn[-1]
+            s = (s >> 1) ^ 0x8408 if s & 0x01 else s >> 1
+        else:
+            s = 0x8408
+        idx[s] = len(syn)
+        syn.append(s)
+    return syn, idx
+
+# bit positions below are in frame data (fcs included) transmission order,
+# byte*8 + k for the bit (1<<k) of byte
+def fcs_locate_1(syndrome, nbits):
+    # the single bit error explaining syndrome, or None
+    syn,idx = fcs_syndromes(nbits)
+    d = idx.get(syndrome)
+    if d is None or d >= nbits:
+        return None
+    return nbits-1-d
+
+def fcs_locate_2(syndrome, nbits, lo = 0, hi = None):
+    # all the 2 bit errors (p, q), lo <= p < q < hi, explaining syndrome, O(n)
+    if hi is None:
+        hi = nbits
+    syn,idx = fcs_syndromes(nbits)
+    found = []
+    for p in range(lo, hi):
+        d = idx.get(syndrome ^ syn[nbits-1-p])
+        if d is not None and d < nbits:
+            q = nbits-1-d
+            if p < q < hi:
+                found.append((p,q))
+    return found
+
 def trim_frame(mv):
     lmv = len(mv)
     for idx in range(lmv):
@@ -50,6 +97,56 @@ def do_bitstuffing(mv, start_bit, stop_bit):
             idx += 1
     return cnt
 
+def line_encode(frame,
+                flags_pre  = 1,    # flag bytes at the start of frame, not stuffed
+                flags_post = 1,    # flag bytes at the end of frame, not stuffed
+                nrzi       = None, # None, no line coding. 0/1, nrzi code from this level
+                ):
+    # single pass ax25 line encoder, replaces reverse_bit_order + do_bitstuffing
+    # bits are written LSB first (ax25 bit order), a 0 is stuffed after five 1s
+    # and optionally nrzi coded. the output is sized for the worst case stuffing
+    # returns (bytearray, stop_bit)
+    lframe = len(frame)
+    data_stop = lframe - flags_post
+    out = bytearray((lframe*8 + ((data_stop-flags_pre)*8)//5 + 7)//8)
+    code = nrzi is not None
+    c    = nrzi    # nrzi level
+    idx  = 0       # output byte index
+    acc  = 0       # byte being written
+    nacc = 0       # bits in acc
+    ones = 0       # running count of consecutive 1s
+    for i in range(lframe):
+        byte = frame[i]
+        stuff = flags_pre <= i < data_stop
+        for k in range(8):
+            b = (byte >> k) & 0x01
+            nb = 1
+            if stuff:
+                if b:
+                    ones += 1
+                    if ones == 5:
+                        nb = 2 # stuffed 0 follows
+                        ones = 0
+                else:
+                    ones = 0
+            for j in range(nb):
+                if j:
+                    b = 0
+                if code:
+                    if b == 0:
+                        c ^= 1 #toggle
+                    b = c
+                acc = (acc << 1) | b
+                nacc += 1
+                if nacc == 8:
+                    out[idx] = acc
+                    idx += 1
+                    acc = 0
+                    nacc = 0
+    if nacc:
+        out[idx] = acc << (8-nacc)
+    return out, idx*8 + nacc
+
 def insert_bit_in_array(mv, bit_idx):
     #shift bytes right
     shift_bytes_right(mv, start_byte = bit_idx//8+1)
@@ -140,3 +237,80 @@ def convert_nrzi(mv, stop_bit):
         mv[idx//8] = assign_bit(mv[idx//8], idx, c)
 
 
+
+
+def create_hdlc_rx(min_len = 18,   # min frame bytes between flags (addrs + ctrl/pid + fcs)
+                   max_len = 2024, # longer frames are dropped
+                   ):
+    # streaming hdlc receiver, fed the unnrzi'd bitstream in chunks (bits, nbits)
+    # as the bits arrive: stuffed bits are dropped, bytes are assembled LSB
+    # first (ax25 bit order) and the fcs is updated a byte at a time.
+    # returns the frames completed in the chunk as (frame, fcs_ok, conf, start, end),
+    # frame is the unstuffed/reversed frame wrapped in flags, as AX25.from_frame expects
+    # with soft bits (confs, one per bit) conf holds the confidence of each data
+    # bit of the frame (fcs included) in the fixer bit order, else None
+    # with bit positions (pos, one per bit) start/end are the positions of the
+    # last bit of the opening and closing flags, else None
+    table = CRC16_AX25
+    buf   = bytearray(max_len+2)
+    buf[0] = AX25_FLAG
+    cbuf  = None
+    n     = 1      # next byte index in buf
+    byte  = 0      # byte being assembled
+    nb    = 0      # bits in byte
+    ones  = 0      # running count of consecutive 1s
+    crc   = 0xffff
+    hunt  = True   # no frame in progress, waiting for a flag
+    start = None   # position of the last flag
+    def inner(bits, nbits, confs = None, pos = None):
+        nonlocal n, byte, nb, ones, crc, hunt, cbuf, start
+        frames = []
+        if confs and cbuf is None:
+            cbuf = bytearray(8*(max_len+1))
+        for i in range(nbits):
+            b = bits[i]
+            if b:
+                ones += 1
+                if ones > 6:
+                    # abort, hunt for the next flag
+                    hunt = True
+                    continue
+            else:
+                if ones == 6:
+                    # flag, the first 7 bits of the flag are in byte if the
+                    # frame ended on a byte boundary
+                    if not hunt and nb == 7 and n-1 >= min_len:
+                        buf[n] = AX25_FLAG
+                        frames.append((bytearray(buf[:n+1]), crc == AX25_FCS_RESIDUE,
+                                       bytes(cbuf[:8*(n-1)]) if confs else None,
+                                       start, int(pos[i]) if pos is not None else None))
+                    start = int(pos[i]) if pos is not None else None
+                    n     = 1
+                    byte  = 0
+                    nb    = 0
+                    ones  = 0
+                    crc   = 0xffff
+                    hunt  = False
+                    continue
+                if ones == 5:
+                    #stuffed bit, drop it
+                    ones = 0
+                    continue
+                ones = 0
+            if hunt:
+                continue
+            byte = (byte >> 1) | (0x80 if b else 0)
+            if confs:
+                cbuf[8*(n-1)+nb] = confs[i]
+            nb += 1
+            if nb == 8:
+                if n > max_len:
+                    hunt = True
+                    continue
+                buf[n] = byte
+                crc = (crc >> 8) ^ table[(crc ^ byte) & 0xff]
+                n += 1
+                byte = 0
+                nb = 0
+        return frames
+    return inner
@@ -0,0 +1,103 @@
+#!python
+
+# queue operations per decoded frame between AFSKDemodulator and AX25FromAFSK
+# packed (bits, nbits, confs, pos) chunks vs the single bit per item transport
+#
+# from the micro-aprs/src folder
+#   python -m bench.bits_q
+#   python -m bench.bits_q test.raw 22050
+
+import sys
+import time
+import asyncio
+
+from array import array
+
+from lib.compat import Queue
+from afsk.mod import AFSKModulator
+from afsk.demod import AFSKDemodulator
+from ax25.ax25 import AX25
+from ax25.from_afsk import AX25FromAFSK
+
+class CountQueue(Queue):
+    # asyncio queue that counts put/get/task_done calls
+    def __init__(self):
+        super().__init__()
+        self.ops = 0
+    async def put(self, item):
+        self.ops += 1
+        await super().put(item)
+    async def get(self):
+        self.ops += 1
+        return await super().get()
+    def task_done(self):
+        self.ops += 1
+        super().task_done()
+
+async def gen_samples(aprs, rate):
+    # modulate aprs strings the same way aprs_mod.py does
+    out = array('h')
+    async with AFSKModulator(sampling_rate = rate) as afsk_mod:
+        for a in aprs:
+            afsk,stop_bit = AX25(aprs = a).to_afsk()
+            await afsk_mod.pad_zeros(10)
+            await afsk_mod.send_flags(4)
+            await afsk_mod.to_samples(afsk = afsk, stop_bit = stop_bit)
+            await afsk_mod.send_flags(4)
+            await afsk_mod.pad_zeros(10)
+            arr,siz = await afsk_mod.flush()
+            out.extend(arr[:siz])
+    return out, len(out)
+
+async def demod_chunks(arr, siz, rate):
+    # run the demodulator, keep the bit chunks it produces
+    in_q = Queue()
+    bits_q = Queue()
+    await in_q.put((arr, siz))
+    async with AFSKDemodulator(sampling_rate = rate,
+                               in_rx         = in_q,
+                               bits_out_q    = bits_q) as afsk_demod:
+        await afsk_demod.join()
+        for t in afsk_demod.tasks:
+            t.cancel()
+    chunks = []
+    while not bits_q.empty():
+        chunks.append(bits_q.get_nowait())
+    return chunks
+
+async def deframe(items):
+    bits_q = CountQueue()
+    ax25_q = Queue()
+    t = time.time()
+    async with AX25FromAFSK(bits_in_q = bits_q,
+                            ax25_q    = ax25_q):
+        for item in items:
+            await bits_q.put(item)
+        await bits_q.join()
+    t = time.time() - t
+    return bits_q.ops, ax25_q.qsize(), t
+
+async def main():
+    if len(sys.argv) > 1:
+        rate = int(sys.argv[2]) if len(sys.argv) > 2 else 22050
+        with open(sys.argv[1], 'rb') as f:
+            arr = array('h', f.read())
+        siz = len(arr)
+    else:
+        rate = 22050
+        with open('test/aprs.txt') as f:
+            aprs = [l.strip() for l in f if l.strip()]
+        arr,siz = await gen_samples(aprs*10, rate)
+
+    chunks = await demod_chunks(arr, siz, rate)
+    bits = [b for bs,n,*_ in chunks for b in bs[:n]]
+
+    print('samples {} bits {} chunks {}'.format(siz, len(bits), len(chunks)))
+    for name,items in (('per bit', bits),
+                       ('packed ', chunks)):
+        ops,frames,t = await deframe(items)
+        print('{} frames {:4} queue ops {:8} ops/frame {:8.1f} deframe {:.3f}s'.format(
+                name, frames, ops, ops/(frames or 1), t))
+
+if __name__ == '__main__':
+    asyncio.run(main())
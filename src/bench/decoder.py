@@ -0,0 +1,79 @@
+#!python
+
+# offline decoding, AFSKDemodulator -> bits_q -> AX25FromAFSK tasks vs the
+# synchronous AFSKDecoder, on the test/aprs.txt packets modulated with added
+# noise fed in blocks of samples, the frames must be the same
+#
+# from the micro-aprs/src folder
+#   python -m bench.decoder
+#   python -m bench.decoder numpy
+
+import sys
+import time
+import asyncio
+
+from lib.compat import Queue
+from afsk.demod import AFSKDemodulator
+from afsk.decoder import AFSKDecoder
+from ax25.from_afsk import AX25FromAFSK
+from bench.bits_q import gen_samples
+from bench.sampler import add_noise
+
+REPEAT = 10
+NOISE = 12000
+BLOCKS = (64, 256, 1024)
+
+async def tasks(arr, rate, backend, blksiz):
+    in_q = Queue()
+    bits_q = Queue()
+    ax25_q = Queue()
+    t = time.perf_counter()
+    async with AFSKDemodulator(sampling_rate = rate,
+                               in_rx         = in_q,
+                               bits_out_q    = bits_q,
+                               backend       = backend) as afsk_demod:
+        async with AX25FromAFSK(bits_in_q = bits_q,
+                                ax25_q    = ax25_q):
+            for i in range(0, len(arr), blksiz):
+                blk = arr[i:i+blksiz]
+                await in_q.put((blk, len(blk)))
+            await afsk_demod.join()
+            await bits_q.join()
+        for t_ in afsk_demod.tasks:
+            t_.cancel()
+    t = time.perf_counter() - t
+    frames = []
+    while not ax25_q.empty():
+        frames.append(bytes(ax25_q.get_nowait().to_aprs()))
+    return frames, t
+
+def decoder(arr, rate, backend, blksiz):
+    t = time.perf_counter()
+    dec = AFSKDecoder(sampling_rate = rate,
+                      backend       = backend)
+    frames = []
+    for i in range(0, len(arr), blksiz):
+        blk = arr[i:i+blksiz]
+        frames.extend(dec.decode(blk, len(blk)))
+    t = time.perf_counter() - t
+    return [bytes(f.to_aprs()) for f in frames], t
+
+async def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'python'
+    with open('test/aprs.txt') as f:
+        aprs = [l.strip() for l in f if l.strip()]
+    print('# seconds, {} packets, {} backend'.format(len(aprs)*REPEAT, backend))
+    print('{:>6} {:>6} {:>8} {:>8} {:>8} {:>6}'.format('rate', 'block', 'frames', 'tasks', 'decoder', 'same'))
+    ok = True
+    for rate in (11025, 22050):
+        arr,siz = await gen_samples(aprs*REPEAT, rate)
+        arr = add_noise(arr[:siz], NOISE)
+        for blksiz in BLOCKS:
+            ref,t_ref = await tasks(arr, rate, backend, blksiz)
+            out,t_out = decoder(arr, rate, backend, blksiz)
+            ok &= ref == out
+            print('{:>6} {:>6} {:>8} {:>8.2f} {:>8.2f} {:>6}'.format(rate, blksiz, len(ref), t_ref, t_out, str(ref == out)))
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+#!python
+
+# ax25 line encoding of max length frames (8 digis, 256 byte info)
+# reverse_bit_order + do_bitstuffing (in place, shifts the buffer for every
+# stuffed bit) vs the single pass line_encode
+#
+# from the micro-aprs/src folder
+#   python -m bench.encode
+
+import time
+
+from ax25.ax25 import AX25
+from ax25.func import reverse_bit_order
+from ax25.func import do_bitstuffing
+from ax25.func import line_encode
+
+N = 20
+
+def max_frame(info):
+    return AX25(src   = 'KX5X-9',
+                dst   = 'APRS',
+                digis = ['WIDE1-1', 'WIDE2-2', 'RELAY', 'TRACE', 'KX5X-1', 'KX5X-2', 'KX5X-3', 'KX5X-4'],
+                info  = info)
+
+def in_place(ax25):
+    frame = ax25.to_frame()
+    # margin large enough for the worst case, to_afsk used a fixed 8 bytes
+    margin = len(frame)//5+1
+    frame = frame + bytearray(margin)
+    mv = memoryview(frame)
+    stop_bit = (len(frame)-margin)*8
+    reverse_bit_order(mv)
+    return stop_bit + do_bitstuffing(mv, start_bit = 8, stop_bit = stop_bit - 8)
+
+def single_pass(ax25):
+    frame,stop_bit = line_encode(ax25.to_frame())
+    return stop_bit
+
+def main():
+    infos = (('text', bytes(ord('a') + x%26 for x in range(256))),
+             ('0x7e', bytes([0x7e]*256)),
+             ('0xff', bytes([0xff]*256)))
+    for name,info in infos:
+        ax25 = max_frame(info)
+        for fname,f in (('in place   ', in_place),
+                        ('single pass', single_pass)):
+            t = time.time()
+            for i in range(N):
+                stop_bit = f(ax25)
+            t = (time.time() - t)/N
+            print('{} {} bits {:5} {:8.3f} ms/frame'.format(name, fname, stop_bit, t*1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+#!python
+
+# fir kernels, create_fir (multiply and scale every tap) vs create_fir_sym
+# (folded delay line, scaled once) on the demodulator filters, and the
+# frames decoded from the test/ recordings with each, which must not change
+# with numpy, the direct vs fft overlap-save block engines per block size
+#
+# from the micro-aprs/src folder
+#   python -m bench.fir
+
+import sys
+import time
+import wave
+import random
+import asyncio
+
+from array import array
+
+from lib.compat import Queue
+from lib.memoize import memoize_loads
+from afsk.func import create_fir
+from afsk.func import create_fir_sym
+from afsk.demod import AFSKDemodulator
+from ax25.from_afsk import AX25FromAFSK
+
+N = 20000
+FILTERS = (('bpf 11025', ('bpf', 1200, 2200, 11025, 45, 400, 2, 3)),
+           ('bpf 22050', ('bpf', 1200, 2200, 22050, 91, 400, 2, 3)),
+           ('lpf 11025', ('lpf', 800, 11025, 45, 250, 3)),
+           ('lpf 22050', ('lpf', 800, 22050, 91, 250, 3)),
+           )
+RECORDINGS = ('test/ideal.wav', 'test/ttwr.wav', 'test/ISSpkt.wav')
+
+def run(fir, xs):
+    t = time.perf_counter()
+    for x in xs:
+        fir(x)
+    return (time.perf_counter()-t)/len(xs)*1e9
+
+def run_np(fir, xs, blk):
+    t = time.perf_counter()
+    for i in range(0, len(xs)-blk+1, blk):
+        fir(xs[i:i+blk])
+    return (time.perf_counter()-t)/(len(xs)//blk*blk)*1e9
+
+def np_engines(xs):
+    try:
+        import numpy as np
+    except ImportError:
+        return
+    from afsk.func_np import create_fir_sym_np
+    from afsk.func_np import create_fir_fft_np
+    xs = np.array(xs, dtype=np.int64)
+    print('# numpy ns per sample')
+    print('{:>6} {:>6} {:>10} {:>10} {:>10}'.format('ncoefs', 'block', 'direct', 'fft', 'auto'))
+    for ncoefs in (45, 91, 181, 361):
+        # symmetric, random coefs, the cost only depends on the size
+        half = [random.randint(-4000, 4000) for x in range(ncoefs//2+1)]
+        coefs = half + half[-2::-1]
+        for blk in (64, 256, 1024, 4096):
+            print('{:>6} {:>6} {:>10.0f} {:>10.0f} {:>10.0f}'.format(ncoefs, blk,
+                  run_np(create_fir_sym_np(coefs, 10000), xs, blk),
+                  run_np(create_fir_fft_np(coefs, 10000), xs, blk),
+                  run_np(create_fir_fft_np(coefs, 10000, auto = True), xs, blk)))
+
+def read_wav(path):
+    with wave.open(path) as w:
+        arr = array('h', w.readframes(w.getnframes()))
+        return arr, w.getframerate()
+
+async def decode(arr, rate, fold):
+    in_q = Queue()
+    bits_q = Queue()
+    ax25_q = Queue()
+    await in_q.put((arr, len(arr)))
+    async with AFSKDemodulator(sampling_rate = rate,
+                               # filters memoized up to 22050
+                               dsp_rate      = min(rate, 22050),
+                               in_rx         = in_q,
+                               bits_out_q    = bits_q,
+                               options       = {'fir_fold' : fold}) as afsk_demod:
+        async with AX25FromAFSK(bits_in_q = bits_q,
+                                ax25_q    = ax25_q):
+            await afsk_demod.join()
+            await bits_q.join()
+        for t in afsk_demod.tasks:
+            t.cancel()
+    frames = []
+    while not ax25_q.empty():
+        frames.append(bytes(ax25_q.get_nowait().to_frame()))
+    return frames
+
+async def main():
+    random.seed(0)
+    xs = [random.randint(-20000, 20000) for n in range(N)]
+    print('# ns per sample, {} samples'.format(N))
+    print('{:>10} {:>6} {:>10} {:>10}'.format('filter', 'ncoefs', 'fir', 'fir_sym'))
+    for name,key in FILTERS:
+        coefs,g = memoize_loads(*key)
+        print('{:>10} {:>6} {:>10.0f} {:>10.0f}'.format(name, len(coefs),
+              run(create_fir(coefs, g), xs),
+              run(create_fir_sym(coefs, g), xs)))
+    np_engines(xs)
+
+    print('# decoded frames')
+    ok = True
+    for path in RECORDINGS:
+        arr,rate = read_wav(path)
+        ref = await decode(arr, rate, fold = False)
+        out = await decode(arr, rate, fold = True)
+        ok &= len(ref) == len(out)
+        print('{:>16} fir {:3} fir_sym {:3} same frames {}'.format(path, len(ref), len(out), ref == out))
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+#!python
+
+# power meter cost per sample vs window size
+# whole window recomputed for every sample vs running sums (and the
+# exponential window), outputs of both windowed versions must be identical
+#
+# from the micro-aprs/src folder
+#   python -m bench.pwrmtr
+
+import time
+import random
+
+from array import array
+from math import isqrt
+
+from afsk.func import create_power_meter
+
+N = 20000
+WINDOWS = (10, 20, 40, 80, 160, 320)
+
+def create_power_meter_window(siz):
+    # previous implementation, two passes over the window per sample
+    buf = array('i', (0 for x in range(siz)))
+    i = 0
+    def inner(v):
+        nonlocal i
+        buf[i] = v
+        a = 0
+        for k in range(siz):
+            a += buf[k]
+        a //= siz
+        o = 0
+        for k in range(siz):
+            b = buf[k]-a
+            o += b*b
+        o = isqrt(o//siz)
+        i = (i+1)%siz
+        return o
+    return inner
+
+def run(pwrmtr, xs):
+    t = time.perf_counter()
+    out = [pwrmtr(x) for x in xs]
+    return out, (time.perf_counter()-t)/len(xs)*1e9
+
+def main():
+    random.seed(0)
+    # noise with bursts of tone sized dc offsets
+    xs = [random.randint(-2000, 2000) + (3000 if (n//500)%2 else -1000) for n in range(N)]
+    print('# ns per sample, {} samples'.format(N))
+    print('{:>6} {:>10} {:>10} {:>10} {:>6}'.format('window', 'recompute', 'running', 'ema', 'same'))
+    for siz in WINDOWS:
+        ref,t_ref = run(create_power_meter_window(siz), xs)
+        out,t_run = run(create_power_meter(siz), xs)
+        _,t_ema = run(create_power_meter(siz, ema = True), xs)
+        print('{:>6} {:>10.0f} {:>10.0f} {:>10.0f} {:>6}'.format(siz, t_ref, t_run, t_ema, str(ref == out)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!python
+
+# bit clock recovery, zero crossing gaps ('zc') vs pll ('pll')
+# frames decoded from the test/aprs.txt packets modulated with added noise,
+# and the cost per sample of each sampler
+#
+# from the micro-aprs/src folder
+#   python -m bench.sampler
+#   python -m bench.sampler numpy
+
+import sys
+import time
+import random
+import asyncio
+
+from array import array
+
+from lib.compat import Queue
+from afsk.func import create_sampler
+from afsk.func import create_sampler_pll
+from afsk.demod import AFSKDemodulator
+from ax25.from_afsk import AX25FromAFSK
+from bench.bits_q import gen_samples
+
+REPEAT = 10
+NOISE = (0, 8000, 12000, 16000)
+
+def add_noise(arr, level):
+    random.seed(level)
+    return array('h', (max(-32768, min(32767, int(x + random.gauss(0, level)))) for x in arr))
+
+async def decode(arr, rate, sampler, backend):
+    in_q = Queue()
+    bits_q = Queue()
+    ax25_q = Queue()
+    await in_q.put((arr, len(arr)))
+    async with AFSKDemodulator(sampling_rate = rate,
+                               in_rx         = in_q,
+                               bits_out_q    = bits_q,
+                               options       = {'sampler' : sampler},
+                               backend       = backend) as afsk_demod:
+        async with AX25FromAFSK(bits_in_q = bits_q,
+                                ax25_q    = ax25_q):
+            await afsk_demod.join()
+            await bits_q.join()
+        for t in afsk_demod.tasks:
+            t.cancel()
+    frames = []
+    while not ax25_q.empty():
+        frames.append(ax25_q.get_nowait())
+    return frames
+
+def cost(sampler, rate):
+    # nrz square wave at 1200 baud, random bits, ns per sample
+    random.seed(0)
+    xs = []
+    for b in range(2000):
+        xs.extend([1000 if random.random() < .5 else -1000]*int(rate/1200*(b+1) - rate/1200*b))
+    t = time.perf_counter()
+    for x in xs:
+        sampler(x)
+    return (time.perf_counter()-t)/len(xs)*1e9
+
+async def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'python'
+    with open('test/aprs.txt') as f:
+        aprs = [l.strip() for l in f if l.strip()]
+    print('# {} packets, {} backend'.format(len(aprs)*REPEAT, backend))
+    print('{:>6} {:>6} {:>10} {:>10}'.format('rate', 'noise', 'zc', 'pll'))
+    for rate in (11025, 22050):
+        arr,siz = await gen_samples(aprs*REPEAT, rate)
+        for level in NOISE:
+            noisy = add_noise(arr[:siz], level)
+            counts = []
+            for sampler in ('zc', 'pll'):
+                frames = await decode(noisy, rate, sampler, backend)
+                # frames the fixer did not have to touch
+                counts.append('{}/{}'.format(sum(1 for f in frames if not f.fixed), len(frames)))
+            print('{:>6} {:>6} {:>10} {:>10}'.format(rate, level, *counts))
+    print('# ns per sample')
+    for rate in (11025, 22050):
+        print('{:>6} {:>10.0f} {:>10.0f}'.format(rate,
+              cost(create_sampler(fbaud = 1200, fs = rate), rate),
+              cost(create_sampler_pll(fbaud = 1200, fs = rate), rate)))
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+#!python
+
+# frame fixer with hard bits vs soft bits (least confident bits only, tried
+# least confident first), on the test/aprs.txt packets modulated with added
+# noise. frames are checked against the noiseless decode: good/bad frames,
+# how many of them were fixed and the fix candidates tried
+#
+# from the micro-aprs/src folder
+#   python -m bench.soft
+#   python -m bench.soft numpy
+
+import sys
+import asyncio
+
+from lib.compat import Queue
+from afsk.demod import AFSKDemodulator
+from ax25.from_afsk import AX25FromAFSK
+from bench.bits_q import gen_samples
+from bench.sampler import add_noise
+
+REPEAT = 10
+NOISE = (12000, 14000, 16000, 18000)
+
+async def decode(arr, rate, sampler, soft, backend):
+    in_q = Queue()
+    bits_q = Queue()
+    ax25_q = Queue()
+    await in_q.put((arr, len(arr)))
+    async with AFSKDemodulator(sampling_rate = rate,
+                               in_rx         = in_q,
+                               bits_out_q    = bits_q,
+                               options       = {'sampler' : sampler},
+                               backend       = backend,
+                               soft_bits     = soft) as afsk_demod:
+        # no time budget, count every candidate
+        async with AX25FromAFSK(bits_in_q     = bits_q,
+                                ax25_q        = ax25_q,
+                                fix_budget_ms = 1<<30) as bits2ax25:
+            await afsk_demod.join()
+            await bits_q.join()
+        for t in afsk_demod.tasks:
+            t.cancel()
+    frames = []
+    while not ax25_q.empty():
+        ax25 = ax25_q.get_nowait()
+        frames.append((bytes(ax25.to_aprs()), ax25.fixed))
+    return frames, bits2ax25.fix_stats['candidates']
+
+async def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'python'
+    with open('test/aprs.txt') as f:
+        aprs = [l.strip() for l in f if l.strip()]
+    print('# {} packets, {} backend'.format(len(aprs)*REPEAT, backend))
+    print('# good(fixed) bad(fixed) candidates')
+    print('{:>6} {:>6} {:>4} {:>18} {:>18}'.format('rate', 'noise', '', 'hard', 'soft'))
+    for rate in (11025, 22050):
+        arr,siz = await gen_samples(aprs*REPEAT, rate)
+        ref,_ = await decode(arr[:siz], rate, 'zc', False, backend)
+        ref = set(a for a,fixed in ref)
+        for level in NOISE:
+            noisy = add_noise(arr[:siz], level)
+            for sampler in ('zc', 'pll'):
+                cols = []
+                for soft in (False, True):
+                    frames,candidates = await decode(noisy, rate, sampler, soft, backend)
+                    good = [fixed for a,fixed in frames if a in ref]
+                    bad = [fixed for a,fixed in frames if a not in ref]
+                    cols.append('{}({}) {}({}) {}'.format(len(good), sum(1 for x in good if x),
+                                                          len(bad), sum(1 for x in bad if x),
+                                                          candidates))
+                print('{:>6} {:>6} {:>4} {:>18} {:>18}'.format(rate, level, sampler, *cols))
+
+if __name__ == '__main__':
+    asyncio.run(main())
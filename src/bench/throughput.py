@@ -0,0 +1,218 @@
+#!python
+
+# receive path throughput, each dsp stage of AFSKDemodulator, the deframer
+# (AX25FromAFSK) and the whole pipeline (AFSKDecoder) on reproducible corpora:
+# the test/aprs.txt packets modulated with AFSKModulator at 11025, 22050 and
+# 44100 Hz (demodulated at 22050, --dsp_rate) with seeded noise added
+# samples per second, real time factor (seconds of audio per second) and
+# frames decoded, per interpreter (CPython, PyPy, ...) and backend (python,
+# numpy when installed). results can be saved as json and compared with a
+# previous run, eg. before and after a change or CPython vs PyPy
+#
+# from the micro-aprs/src folder
+#   python -m bench.throughput
+#   python -m bench.throughput --json base.json
+#   pypy3 -m bench.throughput --compare base.json
+
+import sys
+import json
+import time
+import platform
+import asyncio
+
+from lib.utils import eprint
+from afsk.demod import AFSKDemodulator
+from afsk.decoder import AFSKDecoder
+from ax25.from_afsk import AX25FromAFSK
+from bench.bits_q import gen_samples
+from bench.sampler import add_noise
+
+REPEAT = 5
+NOISE = (0, 12000)
+RATES = ((11025, None), (22050, None), (44100, 22050)) # (input rate, dsp_rate)
+BLOCK = 1024
+
+def backends():
+    out = ['python']
+    try:
+        import numpy
+        out.append('numpy')
+    except ImportError:
+        pass
+    return out
+
+def new_demod(rate, dsp_rate, backend):
+    return AFSKDemodulator(in_rx         = None,
+                           bits_out_q    = None,
+                           sampling_rate = rate,
+                           dsp_rate      = dsp_rate,
+                           backend       = backend,
+                           chunk_size    = BLOCK)
+
+def timed(f, xs):
+    t = time.perf_counter()
+    for x in xs:
+        f(x)
+    return time.perf_counter() - t
+
+def stage_inputs(arr, rate, dsp_rate, backend):
+    # input of every stage, the chain run once stage by stage
+    # [(name, input)], numpy inputs as blocks
+    dm = new_demod(rate, dsp_rate, backend)
+    out = []
+    if backend == 'numpy':
+        import numpy as np
+        def blocks(x):
+            return [x[i:i+BLOCK] for i in range(0, len(x), BLOCK)]
+        def run(name, f, x):
+            xs = blocks(x)
+            out.append((name, xs))
+            return [f(b) for b in xs]
+        x = np.array(arr, dtype=np.int64)
+        if dm.resampler:
+            x = np.concatenate(run('resampler', dm.resampler, x))
+        o = np.concatenate(run('bpf', dm.bpf, x))
+        p = np.concatenate(run('pwrmtr', dm.pwrmtr, o))
+        o = o[p >= dm.squelch]
+        o = np.concatenate(run('corr', dm.corr, o))
+        o = np.concatenate(run('lpf', dm.lpf, o))
+        bs = np.concatenate([b for b,c,k in run('sampler', dm.sampler, o)])
+        run('unnrzi', dm.unnrzi, bs)
+        return out, len(p), len(o)
+    def run(name, f, xs):
+        out.append((name, xs))
+        return [f(x) for x in xs]
+    x = arr
+    if dm.resampler:
+        # whole blocks, (array, size) in and out, the output array is reused
+        def resample(b):
+            o,n = dm.resampler(b, len(b), 0)
+            return o[:n]
+        x = [v for o in run('resampler', resample, [arr[i:i+BLOCK] for i in range(0, len(arr), BLOCK)]) for v in o]
+    o = run('bpf', dm.bpf, x)
+    p = run('pwrmtr', dm.pwrmtr, o)
+    o = [v for v,pv in zip(o, p) if pv >= dm.squelch]
+    o = run('corr', dm.corr, o)
+    o = run('lpf', dm.lpf, o)
+    bs = [b for b in run('sampler', dm.sampler, o) if b != 2]
+    run('unnrzi', dm.unnrzi, bs)
+    return out, len(p), len(o)
+
+def bench_stages(arr, rate, dsp_rate, backend):
+    # seconds per stage, each on a fresh demodulator
+    inputs,ndsp,nsql = stage_inputs(arr, rate, dsp_rate, backend)
+    res = []
+    for name,xs in inputs:
+        dm = new_demod(rate, dsp_rate, backend)
+        if name == 'resampler' and backend == 'python':
+            f = lambda b: dm.resampler(b, len(b), 0)
+        else:
+            f = getattr(dm, name)
+        n = sum(len(x) for x in xs) if backend == 'numpy' or name == 'resampler' else len(xs)
+        res.append((name, n, timed(f, xs)))
+    return res, ndsp, nsql
+
+def bench_deframe(arr, rate, dsp_rate, backend):
+    dm = new_demod(rate, dsp_rate, backend)
+    chunks = []
+    for i in range(0, len(arr), BLOCK):
+        blk = arr[i:i+BLOCK]
+        chunks.extend(dm.demod(blk, len(blk)))
+    deframer = AX25FromAFSK(bits_in_q = None, ax25_q = None)
+    frames = []
+    t = time.perf_counter()
+    for item in chunks:
+        frames.extend(deframer.deframe(*item))
+    return sum(item[1] for item in chunks), time.perf_counter() - t, len(frames)
+
+def bench_pipeline(arr, rate, dsp_rate, backend):
+    t = time.perf_counter()
+    dec = AFSKDecoder(sampling_rate = rate,
+                      dsp_rate      = dsp_rate,
+                      backend       = backend,
+                      chunk_size    = BLOCK)
+    frames = []
+    for i in range(0, len(arr), BLOCK):
+        blk = arr[i:i+BLOCK]
+        frames.extend(dec.decode(blk, len(blk)))
+    return time.perf_counter() - t, len(frames)
+
+async def run(repeat):
+    with open('test/aprs.txt') as f:
+        aprs = [l.strip() for l in f if l.strip()]
+    results = []
+    for rate,dsp_rate in RATES:
+        clean,siz = await gen_samples(aprs*repeat, rate)
+        clean = clean[:siz]
+        seconds = siz/rate
+        for level in NOISE:
+            arr = add_noise(clean, level) if level else clean
+            for backend in backends():
+                def add(stage, n, t, frames = None):
+                    results.append({'rate'     : rate,
+                                    'dsp_rate' : dsp_rate or rate,
+                                    'noise'    : level,
+                                    'backend'  : backend,
+                                    'stage'    : stage,
+                                    'items'    : n,         # stage inputs, samples (bits for unnrzi/deframe)
+                                    'seconds'  : t,
+                                    'items_s'  : n/t if t else 0,
+                                    'rtf'      : seconds/t if t else 0,
+                                    'frames'   : frames,
+                                    })
+                    eprint('# {:>5} {:>5} {:>6} {:>6} {:>10} {:>8} {:>8.3f}s'.format(
+                           rate, dsp_rate or rate, level, backend, stage, n, t))
+                stages,_,_ = bench_stages(arr, rate, dsp_rate, backend)
+                for name,n,t in stages:
+                    add(name, n, t)
+                n,t,frames = bench_deframe(arr, rate, dsp_rate, backend)
+                add('deframe', n, t, frames)
+                t,frames = bench_pipeline(arr, rate, dsp_rate, backend)
+                add('pipeline', len(arr), t, frames)
+    return {'implementation' : platform.python_implementation(),
+            'version'        : platform.python_version(),
+            'machine'        : platform.machine(),
+            'packets'        : len(aprs)*repeat,
+            'block'          : BLOCK,
+            'results'        : results}
+
+def key(r):
+    return (r['rate'], r['dsp_rate'], r['noise'], r['backend'], r['stage'])
+
+def report(run, base = None):
+    print('# {} {} {}, {} packets'.format(run['implementation'], run['version'], run['machine'], run['packets']))
+    if base:
+        print('# vs {} {} {}'.format(base['implementation'], base['version'], base['machine']))
+        base = {key(r):r for r in base['results']}
+    print('{:>6} {:>6} {:>6} {:>7} {:>10} {:>12} {:>8} {:>7}{}'.format(
+          'rate', 'dsp', 'noise', 'backend', 'stage', 'items/s', 'rtf', 'frames',
+          ' {:>7} {:>7}'.format('speedup', 'frames') if base else ''))
+    for r in run['results']:
+        line = '{:>6} {:>6} {:>6} {:>7} {:>10} {:>12.0f} {:>8.2f} {:>7}'.format(
+               r['rate'], r['dsp_rate'], r['noise'], r['backend'], r['stage'],
+               r['items_s'], r['rtf'], '' if r['frames'] is None else r['frames'])
+        if base:
+            b = base.get(key(r))
+            if b and b['items_s']:
+                line += ' {:>7.2f} {:>7}'.format(r['items_s']/b['items_s'],
+                                                 '' if b['frames'] is None else b['frames'])
+        print(line)
+
+def main():
+    args = sys.argv[1:]
+    def opt(name):
+        if name in args:
+            return args[args.index(name)+1]
+    repeat = int(opt('--repeat') or REPEAT)
+    base = None
+    if opt('--compare'):
+        with open(opt('--compare')) as f:
+            base = json.load(f)
+    res = asyncio.run(run(repeat))
+    if opt('--json'):
+        with open(opt('--json'), 'w') as f:
+            json.dump(res, f, indent = 1)
+    report(res, base)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+
+# tests run from the micro-aprs/src folder imports, as the scripts do
+#   python -m pytest -q
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
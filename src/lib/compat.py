@@ -38,7 +38,38 @@ if IS_UPY:
 else:
     #python3
     import traceback
-    print_exc = traceback.print_exc
+    # the traceback of err, as sys.print_exception, or of the exception
+    # being handled when called without one
+    def print_exc(err=None):
+        if err is None:
+            traceback.print_exc()
+        else:
+            traceback.print_exception(type(err), err, err.__traceback__)
+
+
+# zero copy byte view on an array, eg. to readinto an array('h')
+if IS_UPY:
+    import uctypes
+    def array_bytes(arr, itemsize):
+        return uctypes.bytearray_at(uctypes.addressof(arr), len(arr)*itemsize)
+else:
+    def array_bytes(arr, itemsize):
+        return memoryview(arr).cast('B')
+
+
+# millisecond ticks, eg. for time budgets, microsecond ticks for profiling
+if IS_UPY:
+    from time import ticks_ms
+    from time import ticks_us
+    from time import ticks_diff
+else:
+    import time
+    def ticks_ms():
+        return int(time.monotonic()*1000)
+    def ticks_us():
+        return time.perf_counter_ns()//1000
+    def ticks_diff(a, b):
+        return a - b
 
 
 # Stdin
@@ -48,4 +48,10 @@ def memoize_dumps(name, res, *args):
         # failed to memoize save
         pass
 
-
+def memoize_args(name):
+    # the args of every memoized result of name
+    try:
+        from lib.memoizedat import j
+    except:
+        return []
+    return [r['args'] for r in j.get(name, [])]
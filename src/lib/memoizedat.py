@@ -1 +1 @@
-j={"bpf": [{"args": [1200, 2200, 11025, 45, 400, 2, 3], "res": [[-136, -37, 233, 297, 4, -222, -9, 246, -98, -747, -646, 356, 954, 275, -480, 335, 1826, 1113, -2368, -4851, -2450, 3283, 6330, 3283, -2450, -4851, -2368, 1113, 1826, 335, -480, 275, 954, 356, -646, -747, -98, 246, -9, -222, 4, 297, 233, -37, -136], 16666]}, {"args": [1200, 2200, 22050, 91, 400, 2, 3], "res": [[-54, -72, -62, -18, 50, 119, 158, 148, 88, 1, -75, -106, -75, 4, 89, 127, 80, -54, -231, -379, -424, -324, -98, 178, 397, 470, 364, 129, -118, -239, -139, 178, 598, 922, 948, 557, -220, -1185, -2026, -2421, -2156, -1221, 170, 1634, 2740, 3151, 2740, 1634, 170, -1221, -2156, -2421, -2026, -1185, -220, 557, 948, 922, 598, 178, -139, -239, -118, 129, 364, 470, 397, 178, -98, -324, -424, -379, -231, -54, 80, 127, 89, 4, -75, -106, -75, 1, 88, 148, 158, 119, 50, -18, -62, -72, -54], 9984]}, {"args": [1400, 1600, 22050, 75, 400, 2, 3], "res": [[-60, -116, -160, -175, -146, -70, 47, 182, 306, 385, 389, 303, 130, -103, -350, -557, -670, -650, -486, -196, 167, 531, 816, 952, 898, 651, 251, -226, -682, -1019, -1160, -1067, -753, -276, 267, 764, 1111, 1236, 1111, 764, 267, -276, -753, -1067, -1160, -1019, -682, -226, 251, 651, 898, 952, 816, 531, 167, -196, -486, -650, -670, -557, -350, -103, 130, 303, 389, 385, 306, 182, 47, -70, -146, -175, -160, -116, -60], 18233]}, {"args": [1400, 1600, 11025, 35, 400, 2, 3], "res": [[-280, -164, 260, 660, 558, -176, -1050, -1249, -362, 1094, 1943, 1310, -517, -2169, -2255, -567, 1648, 2653, 1648, -567, -2255, -2169, -517, 1310, 1943, 1094, -362, -1249, -1050, -176, 558, 660, 260, -164, -280], 8205]}, {"args": [1400, 1600, 5512, 15, 400, 2, 3], "res": [[1143, -588, -2227, 2373, 2362, -4423, -1026, 5340, -1026, -4423, 2362, 2373, -2227, -588, 1143], 4452]}], "lpf": [{"args": [800, 11025, 45, 250, 3], "res": [[-223, -306, -323, -252, -97, 113, 322, 465, 480, 330, 16, -412, -865, -1229, -1389, -1256, -796, -42, 910, 1909, 2788, 3389, 3603, 3389, 2788, 1909, 910, -42, -796, -1256, -1389, -1229, -865, -412, 16, 330, 480, 465, 322, 113, -97, -252, -323, -306, -223], 10667]}, {"args": [800, 22050, 91, 250, 3], "res": [[-86, -114, -137, -154, -162, -161, -148, -124, -89, -45, 5, 59, 113, 163, 204, 233, 245, 239, 211, 162, 93, 5, -98, -209, -324, -435, -534, -615, -670, -693, -679, -625, -530, -394, -222, -17, 212, 457, 708, 955, 1186, 1392, 1563, 1691, 1770, 1797, 1770, 1691, 1563, 1392, 1186, 955, 708, 457, 212, -17, -222, -394, -530, -625, -679, -693, -670, -615, -534, -435, -324, -209, -98, 5, 93, 162, 211, 239, 245, 233, 204, 163, 113, 59, 5, -45, -89, -124, -148, -161, -162, -154, -137, -114, -86], 10599]}, {"args": [800, 22050, 75, 250, 3], "res": [[-72, -33, 12, 61, 109, 154, 191, 216, 226, 218, 191, 143, 76, -8, -107, -214, -325, -431, -527, -604, -656, -677, -663, -609, -514, -380, -210, -8, 218, 459, 707, 951, 1180, 1383, 1552, 1678, 1757, 1783, 1757, 1678, 1552, 1383, 1180, 951, 707, 459, 218, -8, -210, -380, -514, -609, -663, -677, -656, -604, -527, -431, -325, -214, -107, -8, 76, 143, 191, 218, 226, 216, 191, 154, 109, 61, 12, -33, -72], 12671]}, {"args": [800, 11025, 35, 250, 3], "res": [[137, 317, 432, 428, 270, -36, -446, -873, -1209, -1345, -1199, -740, 2, 930, 1902, 2755, 3338, 3545, 3338, 2755, 1902, 930, 2, -740, -1199, -1345, -1209, -873, -446, -36, 270, 428, 432, 317, 137], 12871]}, {"args": [800, 5512, 15, 250, 3], "res": [[881, 44, -1662, -2733, -1607, 1785, 5571, 7221, 5571, 1785, -1607, -2733, -1662, 44, 881], 11779]}]}
\ No newline at end of file
+j={"bpf": [{"args": [1200, 2200, 11025, 45, 400, 2, 3], "res": [[-136, -37, 233, 297, 4, -222, -9, 246, -98, -747, -646, 356, 954, 275, -480, 335, 1826, 1113, -2368, -4851, -2450, 3283, 6330, 3283, -2450, -4851, -2368, 1113, 1826, 335, -480, 275, 954, 356, -646, -747, -98, 246, -9, -222, 4, 297, 233, -37, -136], 16666]}, {"args": [1200, 2200, 22050, 91, 400, 2, 3], "res": [[-54, -72, -62, -18, 50, 119, 158, 148, 88, 1, -75, -106, -75, 4, 89, 127, 80, -54, -231, -379, -424, -324, -98, 178, 397, 470, 364, 129, -118, -239, -139, 178, 598, 922, 948, 557, -220, -1185, -2026, -2421, -2156, -1221, 170, 1634, 2740, 3151, 2740, 1634, 170, -1221, -2156, -2421, -2026, -1185, -220, 557, 948, 922, 598, 178, -139, -239, -118, 129, 364, 470, 397, 178, -98, -324, -424, -379, -231, -54, 80, 127, 89, 4, -75, -106, -75, 1, 88, 148, 158, 119, 50, -18, -62, -72, -54], 9984]}, {"args": [1400, 1600, 22050, 75, 400, 2, 3], "res": [[-60, -116, -160, -175, -146, -70, 47, 182, 306, 385, 389, 303, 130, -103, -350, -557, -670, -650, -486, -196, 167, 531, 816, 952, 898, 651, 251, -226, -682, -1019, -1160, -1067, -753, -276, 267, 764, 1111, 1236, 1111, 764, 267, -276, -753, -1067, -1160, -1019, -682, -226, 251, 651, 898, 952, 816, 531, 167, -196, -486, -650, -670, -557, -350, -103, 130, 303, 389, 385, 306, 182, 47, -70, -146, -175, -160, -116, -60], 18233]}, {"args": [1400, 1600, 11025, 35, 400, 2, 3], "res": [[-280, -164, 260, 660, 558, -176, -1050, -1249, -362, 1094, 1943, 1310, -517, -2169, -2255, -567, 1648, 2653, 1648, -567, -2255, -2169, -517, 1310, 1943, 1094, -362, -1249, -1050, -176, 558, 660, 260, -164, -280], 8205]}, {"args": [1400, 1600, 5512, 15, 400, 2, 3], "res": [[1143, -588, -2227, 2373, 2362, -4423, -1026, 5340, -1026, -4423, 2362, 2373, -2227, -588, 1143], 4452]}, {"args": [1200, 2200, 11025, 27, 460, 7, 24], "res": [[-3201, -3921, 1607, 5761, 487, -7010, -1721, 13470, 14793, -8821, -31794, -20467, 18536, 40409, 18536, -20467, -31794, -8821, 14793, 13470, -1721, -7010, 487, 5761, 1607, -3921, -3201], 89405]}, {"args": [1200, 2200, 11025, 45, 460, 6, 6], "res": [[-119, 28, 463, 616, 106, -467, -328, 63, -438, -1500, -1235, 841, 2357, 1394, -70, 1080, 3210, 815, -6805, -11429, -4963, 8649, 15740, 8649, -4963, -11429, -6805, 815, 3210, 1080, -70, 1394, 2357, 841, -1235, -1500, -438, 63, -328, -467, 106, 616, 463, 28, -119], 41323]}, {"args": [1200, 2200, 11025, 45, 400, 1, 3], "res": [[-153, -83, 172, 236, -51, -248, 42, 398, 99, -602, -607, 301, 800, -37, -945, -65, 1861, 1783, -1317, -4046, -2462, 2377, 5041, 2377, -2462, -4046, -1317, 1783, 1861, -65, -945, -37, 800, 301, -607, -602, 99, 398, 42, -248, -51, 236, 172, -83, -153], 12890]}, {"args": [1200, 2200, 22050, 55, 460, 7, 24], "res": [[-598, -1593, -2176, -1949, -836, 809, 2296, 2882, 2143, 247, -2014, -3502, -3226, -865, 2945, 6722, 8660, 7385, 2641, -4416, -11483, -15897, -15645, -10229, -985, 9276, 17228, 20215, 17228, 9276, -985, -10229, -15645, -15897, -11483, -4416, 2641, 7385, 8660, 6722, 2945, -865, -3226, -3502, -2014, 247, 2143, 2882, 2296, 809, -836, -1949, -2176, -1593, -598], 133489]}, {"args": [1200, 2200, 22050, 91, 460, 6, 6], "res": [[-42, -63, -49, 14, 120, 234, 311, 308, 214, 53, -118, -230, -241, -156, -35, 35, -22, -224, -510, -757, -822, -619, -162, 420, 928, 1173, 1071, 690, 235, -34, 70, 551, 1192, 1614, 1426, 408, -1348, -3404, -5086, -5710, -4838, -2478, 866, 4317, 6900, 7856, 6900, 4317, 866, -2478, -4838, -5710, -5086, -3404, -1348, 408, 1426, 1614, 1192, 551, 70, -34, 235, 690, 1071, 1173, 928, 420, -162, -619, -822, -757, -510, -224, -22, 35, -35, -156, -241, -230, -118, 53, 214, 308, 311, 234, 120, 14, -49, -63, -42], 29352]}, {"args": [1200, 2200, 22050, 91, 400, 1, 3], "res": [[-54, -80, -78, -41, 22, 88, 127, 117, 59, -26, -98, -119, -72, 29, 140, 202, 172, 45, -140, -306, -376, -304, -103, 150, 348, 394, 253, -26, -317, -471, -377, -23, 483, 938, 1124, 892, 241, -660, -1519, -2019, -1935, -1228, -74, 1182, 2147, 2508, 2147, 1182, -74, -1228, -1935, -2019, -1519, -660, 241, 892, 1124, 938, 483, -23, -377, -471, -317, -26, 253, 394, 348, 150, -103, -304, -376, -306, -140, 45, 172, 202, 140, 29, -72, -119, -98, -26, 59, 117, 127, 88, 22, -41, -78, -80, -54], 5502]}], "lpf": [{"args": [800, 11025, 45, 250, 3], "res": [[-223, -306, -323, -252, -97, 113, 322, 465, 480, 330, 16, -412, -865, -1229, -1389, -1256, -796, -42, 910, 1909, 2788, 3389, 3603, 3389, 2788, 1909, 910, -42, -796, -1256, -1389, -1229, -865, -412, 16, 330, 480, 465, 322, 113, -97, -252, -323, -306, -223], 10667]}, {"args": [800, 22050, 91, 250, 3], "res": [[-86, -114, -137, -154, -162, -161, -148, -124, -89, -45, 5, 59, 113, 163, 204, 233, 245, 239, 211, 162, 93, 5, -98, -209, -324, -435, -534, -615, -670, -693, -679, -625, -530, -394, -222, -17, 212, 457, 708, 955, 1186, 1392, 1563, 1691, 1770, 1797, 1770, 1691, 1563, 1392, 1186, 955, 708, 457, 212, -17, -222, -394, -530, -625, -679, -693, -670, -615, -534, -435, -324, -209, -98, 5, 93, 162, 211, 239, 245, 233, 204, 163, 113, 59, 5, -45, -89, -124, -148, -161, -162, -154, -137, -114, -86], 10599]}, {"args": [800, 22050, 75, 250, 3], "res": [[-72, -33, 12, 61, 109, 154, 191, 216, 226, 218, 191, 143, 76, -8, -107, -214, -325, -431, -527, -604, -656, -677, -663, -609, -514, -380, -210, -8, 218, 459, 707, 951, 1180, 1383, 1552, 1678, 1757, 1783, 1757, 1678, 1552, 1383, 1180, 951, 707, 459, 218, -8, -210, -380, -514, -609, -663, -677, -656, -604, -527, -431, -325, -214, -107, -8, 76, 143, 191, 218, 226, 216, 191, 154, 109, 61, 12, -33, -72], 12671]}, {"args": [800, 11025, 35, 250, 3], "res": [[137, 317, 432, 428, 270, -36, -446, -873, -1209, -1345, -1199, -740, 2, 930, 1902, 2755, 3338, 3545, 3338, 2755, 1902, 930, 2, -740, -1199, -1345, -1209, -873, -446, -36, 270, 428, 432, 317, 137], 12871]}, {"args": [800, 5512, 15, 250, 3], "res": [[881, 44, -1662, -2733, -1607, 1785, 5571, 7221, 5571, 1785, -1607, -2733, -1662, 44, 881], 11779]}, {"args": [1000, 11025, 37, 360, 3], "res": [[-158, -314, -383, -299, -55, 272, 538, 581, 298, -290, -1014, -1597, -1746, -1262, -140, 1404, 2984, 4163, 4599, 4163, 2984, 1404, -140, -1262, -1746, -1597, -1014, -290, 298, 581, 538, 272, -55, -299, -383, -314, -158], 10563]}, {"args": [1000, 11025, 45, 360, 3], "res": [[101, 155, 133, 17, -166, -343, -421, -330, -67, 283, 565, 612, 321, -282, -1022, -1617, -1768, -1280, -149, 1405, 2993, 4177, 4615, 4177, 2993, 1405, -149, -1280, -1768, -1617, -1022, -282, 321, 612, 565, 283, -67, -330, -421, -343, -166, 17, 133, 155, 101], 11249]}, {"args": [1000, 22050, 73, 360, 3], "res": [[-75, -117, -155, -181, -192, -183, -153, -102, -33, 48, 132, 209, 267, 298, 292, 245, 154, 23, -139, -320, -503, -669, -798, -873, -877, -799, -637, -393, -76, 295, 699, 1108, 1493, 1828, 2087, 2250, 2306, 2250, 2087, 1828, 1493, 1108, 699, 295, -76, -393, -637, -799, -877, -873, -798, -669, -503, -320, -139, 23, 154, 245, 292, 298, 267, 209, 132, 48, -33, -102, -153, -183, -192, -181, -155, -117, -75], 10612]}, {"args": [1000, 22050, 91, 360, 3], "res": [[31, 52, 68, 78, 78, 66, 42, 7, -37, -85, -132, -173, -201, -210, -198, -163, -106, -31, 55, 144, 223, 283, 313, 305, 254, 158, 23, -143, -328, -513, -680, -809, -881, -882, -802, -637, -390, -72, 300, 704, 1112, 1496, 1829, 2086, 2249, 2304, 2249, 2086, 1829, 1496, 1112, 704, 300, -72, -390, -637, -802, -882, -881, -809, -680, -513, -328, -143, 23, 158, 254, 305, 313, 283, 223, 144, 55, -31, -106, -163, -198, -210, -201, -173, -132, -85, -37, 7, 42, 66, 78, 78, 68, 52, 31], 11270]}]}
\ No newline at end of file
@@ -100,6 +100,17 @@ def demod_parse_args(args):
             'hf'      : False,
             'vhf'     : False,
             'options' : {},
+            'backend' : 'python',
+            'profiles': None,
+            'inproc'  : False,
+            'dsp_rate': None,
+            'filter_engine' : 'auto',
+            'soft'    : False,
+            'jobs'    : None,
+            'offsets' : False,
+            'stats'   : None,
+            'stats_file' : None,
+            'usbreset' : None,
         },
         'in' : {
             'type' : 's16',
@@ -123,9 +134,24 @@ aprs_demod.py
 
 OPTIONS:
 -r, --rate       22050 (default)
+--dsp_rate       resample the input to this rate before demodulating, eg. -r 48000 --dsp_rate 11025
 -vhf             VHF mode, space:2200 mark:1200, baud:1200 (default)
 -hf              HF mode, space:1600 mark:1400, baud:300
 -v, --verbose    verbose intermediate output to stderr
+-b, --backend    'python' (default) | 'numpy' block processing (requires numpy)
+--filter_engine  numpy backend filters, 'auto' (default) | 'direct' | 'fft' overlap-save
+--soft           soft bits, the frame fixer only flips the least confident bits
+--gate           only run the filters while there is afsk (default for rtl_fm), see fir_options gate_*
+--squelch_ratio  adaptive squelch at this times the noise floor, eg. 2, see fir_options squelch_*
+-p, --profiles   run several demodulator variants and merge their frames, comma
+                 separated fir_profiles names, eg. default,germany,ttwr,tnc
+--inproc         run the variants in this process instead of one process each
+-j, --jobs       decode a file in chunks on this many processes, 0 one per core
+--offsets        prefix each frame with the input sample positions of its opening and
+                 closing flags, and the time it was received for stdin and rtl_fm
+--stats          profile the demodulator stages, dump the stats to stderr every this many seconds
+--stats_file     append the stats to this file as json lines instead
+--usbreset       rtl_fm, usbreset this device (vendor:product) before restarting after a device error
 
 DETAIL DEBUG MODE, output samples at specific stages within pipeline. Nominall use this
 option to create wav files at each step and view them in audacity to see what's up.
@@ -134,7 +160,7 @@ Stages: input, bandpass filter, correlator, and lowpass filter.
 
 -t INPUT TYPE OPTIONS:
 intype       's16' | 'u16'
-infile       '-' (default stdin) | 'filename.raw' raw file | 'rtl_fm' input from rtl_fm
+infile       '-' (default stdin) | 'filename.raw' raw file | 'filename.wav' wav file | 'rtl_fm' input from rtl_fm
 
 -t OUTPUT TYPE OPTIONS:
 outtype       'aprs' strings
@@ -151,6 +177,8 @@ outfile       '-' (default stdout)
             r['args']['rate'] = get_arg_val(args, '--rate', int)
         if '-r' in args:
             r['args']['rate'] = get_arg_val(args, '-r', int)
+        if '--dsp_rate' in args:
+            r['args']['dsp_rate'] = get_arg_val(args, '--dsp_rate', int)
         if '-hf' in args:
             r['args']['hf'] = True
             r['args']['vhf'] = False
@@ -159,6 +187,32 @@ outfile       '-' (default stdout)
             r['args']['hf'] = False
         if '-v' in args or '--verbose' in args:
             r['args']['verbose'] = True
+        if '--backend' in args:
+            r['args']['backend'] = get_arg_val(args, '--backend', str)
+        if '-b' in args:
+            r['args']['backend'] = get_arg_val(args, '-b', str)
+        if '--filter_engine' in args:
+            r['args']['filter_engine'] = get_arg_val(args, '--filter_engine', str)
+        if '--soft' in args:
+            r['args']['soft'] = True
+        if '--profiles' in args:
+            r['args']['profiles'] = get_arg_val(args, '--profiles', str).split(',')
+        if '-p' in args:
+            r['args']['profiles'] = get_arg_val(args, '-p', str).split(',')
+        if '--inproc' in args:
+            r['args']['inproc'] = True
+        if '--jobs' in args:
+            r['args']['jobs'] = get_arg_val(args, '--jobs', int)
+        if '-j' in args:
+            r['args']['jobs'] = get_arg_val(args, '-j', int)
+        if '--offsets' in args:
+            r['args']['offsets'] = True
+        if '--stats' in args:
+            r['args']['stats'] = get_arg_val(args, '--stats', float)
+        if '--stats_file' in args:
+            r['args']['stats_file'] = get_arg_val(args, '--stats_file', str)
+        if '--usbreset' in args:
+            r['args']['usbreset'] = get_arg_val(args, '--usbreset', str)
         if '--debug_samples' in args:
             r['args']['debug_samples'] = get_arg_val(args, '--debug_samples', str)
         if '-d' in args:
@@ -169,6 +223,10 @@ outfile       '-' (default stdout)
             jsonstr = jsonstr.replace('\\','')
             r['args']['options'] = jsonloads(jsonstr)
             # print('OPTIONS:{}'.format(r['args']['options']))
+        if '--gate' in args:
+            r['args']['options']['gate'] = True
+        if '--squelch_ratio' in args:
+            r['args']['options']['squelch_ratio'] = get_arg_val(args, '--squelch_ratio', float)
     except IndexError:
         pass
     if len(spl) == 2:
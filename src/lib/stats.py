@@ -0,0 +1,31 @@
+
+# opt-in instrumentation of the receive path (AFSKDemodulator, AX25FromAFSK)
+# stages are timed on one block (chunk) in stats_every, the counters are kept
+# for every block. each stage is [calls, items, us], items the samples (bits,
+# frame bytes) it was given, so us/items is the cost per sample of the stage
+# even if only some blocks are timed
+
+from lib.compat import ticks_us
+from lib.compat import ticks_diff
+
+def new_stages(names):
+    return {name:[0, 0, 0] for name in names}
+
+# add a timed call to stage s, t the ticks_us() it started at
+def stage_add(s, calls, items, t):
+    s[0] += calls
+    s[1] += items
+    s[2] += ticks_diff(ticks_us(), t)
+
+# one line per stage, cost per item and share of the timed total, then the counters
+def format_stats(name, stats):
+    lines = []
+    stages = stats['stages']
+    total = sum(s[2] for s in stages.values()) or 1
+    for k,(calls,items,us) in stages.items():
+        if calls:
+            lines.append('{} {:>9} {:5.1f}% {:8.3f}us/item {:>10} items {:>8} calls'.format(
+                         name, k, 100*us/total, us/(items or 1), items, calls))
+    counters = ['{} {}'.format(k, v) for k,v in stats.items() if k != 'stages']
+    lines.append('{} {}'.format(name, ', '.join(counters)))
+    return lines
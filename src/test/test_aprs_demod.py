@@ -0,0 +1,25 @@
+
+# aprs_demod.py command line on the recordings in test/
+
+import os
+import sys
+import subprocess
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def aprs_demod(*args):
+    p = subprocess.run([sys.executable, 'aprs_demod.py'] + list(args),
+                       cwd = SRC_DIR, capture_output = True, text = True, timeout = 300)
+    return p.stdout, p.stderr
+
+def test_iss_wav():
+    # 44100 Hz wav, decoded at a rate with memoized filters (no scipy)
+    out,err = aprs_demod('-t', 'test/ISSpkt.wav')
+    assert '# WAV  44100 Hz' in err
+    assert '# DSPR 22050' in err
+    assert 'RS0ISS>CQ:>ARISS - International Space Station' in out
+
+def test_iss_wav_dsp_rate():
+    out,err = aprs_demod('--dsp_rate', '11025', '-t', 'test/ISSpkt.wav')
+    assert 'no memoized filters' not in err # as given, not defaulted
+    assert 'RS0ISS>CQ:>ARISS - International Space Station' in out
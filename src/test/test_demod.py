@@ -0,0 +1,64 @@
+
+# AFSKDemodulator resampling front-end (dsp_rate), the frame positions are
+# input sample positions whatever rate the filters run at, and the filter
+# engine options
+
+import os
+import math
+import asyncio
+import pytest
+from array import array
+
+from afsk.func import create_resampler
+from afsk.func import resample_ratio
+from afsk.decoder import decode_samples
+from bench.bits_q import gen_samples
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def packets():
+    with open(os.path.join(TEST_DIR, 'aprs.txt')) as f:
+        return [l.strip() for l in f if l.strip()][:8]
+
+def interp(x, rate, fs = 22050):
+    # x (at fs) linearly interpolated at rate, no delay
+    out = array('h')
+    for i in range(len(x)*rate//fs):
+        t = i*fs/rate
+        k = int(t)
+        f = t - k
+        b = x[k+1] if k+1 < len(x) else 0
+        out.append(round(x[k]*(1-f) + b*f))
+    return out
+
+def test_resampler_delay():
+    # a slow pulse comes out delay up sampled samples late
+    for fs_in,fs_out in ((44100, 22050), (48000, 22050), (48000, 12000)):
+        up,down = resample_ratio(fs_in, fs_out)
+        for nphase in (8, 17, 32):
+            resampler,delay = create_resampler(up, down, nphase)
+            x = array('h', (int(20000*math.exp(-((i-500)/40)**2)) for i in range(2000)))
+            o,n = resampler(x, len(x))
+            o = list(o[:n])
+            centre = sum(k*v for k,v in enumerate(o))/sum(o) # output samples
+            assert abs((centre*down - delay)/up - 500) < 1, (fs_in, fs_out, nphase)
+
+def test_positions_with_dsp_rate():
+    ref,_ = asyncio.run(gen_samples(packets(), 22050))
+    frames = decode_samples(ref, rate = 22050)
+    assert frames
+    for rate in (44100, 48000, 66150):
+        arr = interp(ref, rate)
+        got = decode_samples(arr, rate = rate, dsp_rate = 22050)
+        assert [f.aprs for f in got] == [f.aprs for f in frames]
+        for f,g in zip(frames, got):
+            # within a dsp sample
+            assert abs(g.start*22050/rate - f.start) <= 1, rate
+            assert abs(g.end*22050/rate - f.end) <= 1, rate
+
+def test_fft_engine_needs_folded_filters():
+    ref,_ = asyncio.run(gen_samples(packets()[:1], 22050))
+    frames = decode_samples(ref, backend = 'numpy', filter_engine = 'fft')
+    assert frames
+    with pytest.raises(Exception, match = 'fir_fold'):
+        decode_samples(ref, backend = 'numpy', filter_engine = 'fft', options = {'fir_fold': False})
@@ -0,0 +1,104 @@
+
+# read_samples_from_rtl_fm watchdog, with a fake rtl_fm (python script) that
+# exits, stalls or reports a device error
+
+import sys
+import asyncio
+
+from afsk.ingress import read_samples_from_rtl_fm
+
+FAKE_RTL_FM = '''
+import sys
+import time
+mode = sys.argv[1]
+if mode == 'error':
+    # a lost dongle, rtl_fm hangs after the error
+    sys.stderr.write('usb_claim_interface error -6\\n')
+    sys.stderr.flush()
+    time.sleep(60)
+sys.stdout.buffer.write(bytes(4000))
+sys.stdout.flush()
+if mode == 'stall':
+    time.sleep(60)
+sys.stdout.close()
+time.sleep(0.1)
+sys.stderr.write('Signal caught, exiting!\\n')
+'''
+
+def watch(tmp_path, mode, restarts, **kwargs):
+    # run the watchdog until it gives up or restarted rtl_fm restarts times
+    # returns (status, samples received, whether it gave up)
+    script = tmp_path / 'rtl_fm.py'
+    script.write_text(FAKE_RTL_FM)
+    async def main():
+        status = {}
+        in_q = asyncio.Queue(2)
+        task = asyncio.create_task(read_samples_from_rtl_fm(in_q,
+                                        cmd        = '{} {} {}'.format(sys.executable, script, mode),
+                                        chunk_size = 1000,
+                                        stall_secs = 0.5,
+                                        backoff    = 0.05,
+                                        status     = status,
+                                        **kwargs))
+        samples = 0
+        while True:
+            try:
+                arr_siz = await asyncio.wait_for(in_q.get(), 0.1)
+            except asyncio.TimeoutError:
+                arr_siz = ()
+            if arr_siz is None:
+                return status, samples, True
+            if arr_siz:
+                samples += arr_siz[1]
+            if status['restarts'] >= restarts:
+                # wait_for (3.11) drops a cancel that races a read completing,
+                # cancel again and keep the queue drained until it ends
+                while not task.done():
+                    task.cancel()
+                    await asyncio.wait([task], timeout = 0.1)
+                    while not in_q.empty():
+                        in_q.get_nowait()
+                return status, samples, False
+    return asyncio.run(asyncio.wait_for(main(), 30))
+
+def restart_delays(err):
+    return [line.split(' in ')[-1] for line in err.splitlines() if ', restart ' in line]
+
+def test_exit(tmp_path, capsys):
+    status,samples,gave_up = watch(tmp_path, 'exit', 3, max_restarts = 1)
+    err = capsys.readouterr().err
+    assert not gave_up # every run delivered samples, not failing in a row
+    assert samples >= 3*2000
+    assert 'eof, restart 1' in err
+    assert 'Signal caught, exiting!' in err # stderr after stdout closed
+    assert set(restart_delays(err)) == {'0.05s'} # backoff reset by the samples
+    assert status['device_errors'] == 0
+
+def test_stall(tmp_path, capsys):
+    status,samples,gave_up = watch(tmp_path, 'stall', 2)
+    err = capsys.readouterr().err
+    assert not gave_up
+    assert samples >= 2*2000
+    assert 'stalled, restart 1' in err
+    assert 'killing rtl_fm process' in err
+
+def test_device_error(tmp_path, capsys):
+    status,samples,gave_up = watch(tmp_path, 'error', 10, max_restarts = 2)
+    err = capsys.readouterr().err
+    assert gave_up
+    assert samples == 0
+    assert status['restarts'] == 2
+    assert status['device_errors'] == 3
+    assert status['last_error'] == 'usb_claim_interface error -6'
+    assert restart_delays(err) == ['0.05s', '0.1s'] # doubled, no samples in between
+    assert status['downtime'] > 0.1
+
+def test_reset_failure(tmp_path, capsys):
+    # a missing reset command is logged, the restarts go on
+    status,samples,gave_up = watch(tmp_path, 'error', 10, max_restarts = 2,
+                                   reset_cmd = str(tmp_path / 'usbreset'))
+    err = capsys.readouterr().err
+    assert gave_up
+    assert status['restarts'] == 2
+    assert err.count('usbreset') >= 2
+    assert restart_delays(err) == ['0.05s', '0.1s']
@@ -1,4 +1,4 @@
 #!/usr/bin/bash
 usbreset  0bda:2838
 #rtl_fm -f 144.390M -s 22050 -g 50 -l 0 - | pypy3 aprs_demod.py -t raw - | python aprs_is.py -c KX5X-10 -p 17081 -lat 29.699616621630348 -lon -95.75020574442557
-python aprs_demod.py -t raw rtl_fm | python aprs_is.py -c KX5X-10 -p 17081 -lat 29.699616621630348 -lon -95.75020574442557
+python aprs_demod.py --usbreset 0bda:2838 -t raw rtl_fm | python aprs_is.py -c KX5X-10 -p 17081 -lat 29.699616621630348 -lon -95.75020574442557
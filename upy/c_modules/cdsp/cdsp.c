@@ -188,44 +188,85 @@ static mp_obj_t mp_fir_core(size_t n_args, const mp_obj_t *args) {
 }
 MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(fir_core_obj, 5, 5, mp_fir_core);
 
+// SYMMETRIC FIR CORE
+// ARGS: hcoefs, buf, v, idx, scale
+// hcoefs, first half of symmetric coefs (and the middle one if odd)
+// buf, delay line kept twice (2*ncoefs) so the window is contiguous
+// OUT : o
+static mp_obj_t mp_fir_sym_core(size_t n_args, const mp_obj_t *args) {
+    (void)n_args; // always 5 args: hcoefs, buf, v, idx, scale
+    mp_obj_array_t *coefs_array = MP_OBJ_TO_PTR(args[0]);
+    mp_obj_array_t *buf_array = MP_OBJ_TO_PTR(args[1]);
+    int32_t v = mp_obj_get_int(args[2]);
+    int32_t idx = mp_obj_get_int(args[3]);
+    int64_t scale = mp_obj_get_int(args[4]);
+
+    int32_t *coefs = coefs_array->items;
+    int32_t *buf = buf_array->items;
+    int32_t ncoefs = buf_array->len/2;
+    int32_t nh = ncoefs/2;
+
+    buf[idx] = v;
+    buf[idx+ncoefs] = v;
+    idx = idx+1 == ncoefs ? 0 : idx+1;
+    int32_t k = idx+ncoefs-1; // newest sample, oldest is at idx
+
+    // fold, full precision sum, scale once
+    int64_t o = 0;
+    for(int32_t j=0; j<nh; j++){
+        o += (int64_t)coefs[j] * ((int64_t)buf[k-j] + (int64_t)buf[idx+j]);
+    }
+    if(ncoefs & 1){
+        o += (int64_t)coefs[nh] * (int64_t)buf[k-nh];
+    }
+    // floor like python
+    int64_t q = o/scale;
+    if((o%scale) && ((o<0) != (scale<0))){
+        q -= 1;
+    }
+    return mp_obj_new_int(q);
+}
+MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(fir_sym_core_obj, 5, 5, mp_fir_sym_core);
+
 // POWER METER 
-// ARGS:  buf, v, idx
-// OUT : tuple(idx, o)
-static mp_obj_t mp_power_meter_core(mp_obj_t buf_obj, mp_obj_t v_obj, mp_obj_t idx_obj) {
-    mp_obj_array_t *buf_array = MP_OBJ_TO_PTR(buf_obj);
-    int32_t v = mp_obj_get_int(v_obj);
-    int32_t idx = mp_obj_get_int(idx_obj);
+// ARGS:  buf, st, v, idx
+// st holds the running sum and sum of squares of buf as two int64, updated in place.
+// it is an array('i') of 4 items (16 bytes, gc blocks are 8 byte aligned), 'q'
+// arrays need long int support that not every port has. sample positions elsewhere
+// are 'l' on micropython, these sums are never read from python
+// OUT : o
+static mp_obj_t mp_power_meter_core(size_t n_args, const mp_obj_t *args) {
+    (void)n_args; // always 4 args: buf, st, v, idx
+    mp_obj_array_t *buf_array = MP_OBJ_TO_PTR(args[0]);
+    mp_obj_array_t *st_array = MP_OBJ_TO_PTR(args[1]);
+    int32_t v = mp_obj_get_int(args[2]);
+    int32_t idx = mp_obj_get_int(args[3]);
 
-    int64_t a = 0;
-    int32_t p = 0;
     int32_t siz = buf_array->len;
     int32_t *buf = buf_array->items;
+    int64_t *st = st_array->items; // 4 x int32, see above
 
+    // swap the oldest sample for the new one in the sums
+    // 64 bit, no limit on the window for s16 samples, as python
+    int64_t u = buf[idx];
+    int64_t s = st[0] + v - u;
+    int64_t q = st[1] + (int64_t)v*v - u*u;
     buf[idx] = v;
+    st[0] = s;
+    st[1] = q;
 
-    // get dc point
-    for(int32_t i=0; i<siz; i++){
-        a += buf[i];
-    }
-    a /= siz;
-
-    for(int32_t i=0; i<siz; i++){
-        int32_t k = idx-i>=0 ? idx-i : siz+idx-i; // emulate python mod for negative numbers
-        p += (buf[k]-a) * (buf[k]-a);
+    // get dc point, floor like python
+    int64_t a = s/siz;
+    if((s%siz) && s<0){
+        a -= 1;
     }
-    p = isqrt32(p);
+    // sum((buf[i]-a)^2) = q - (2*s - siz*a)*a, /siz fits 32 bits for s16 samples
+    int64_t p = (q - (2*s - siz*a)*a)/siz;
+    p = isqrt32((uint32_t)(p > 0xffffffff ? 0xffffffff : p));
 
     return mp_obj_new_int(p);
-
-    // PASSING A TUPLE IS SLOW, WE'LL CALC IDX IN PARENT
-    // idx = (idx+1)%siz;
-    // mp_obj_t ret = mp_obj_new_tuple(2, NULL);
-    // mp_obj_tuple_t *tuple = MP_OBJ_TO_PTR(ret);
-    // tuple->items[0] = mp_obj_new_int(idx);
-    // tuple->items[1] = mp_obj_new_int(p);
-    // return ret;
 }
-static MP_DEFINE_CONST_FUN_OBJ_3(power_meter_core_obj, mp_power_meter_core);
+MP_DEFINE_CONST_FUN_OBJ_VAR_BETWEEN(power_meter_core_obj, 4, 4, mp_power_meter_core);
 
 /*static mp_obj_t mp_tim_cb(mp_obj_t ctx_obj) {*/
 
@@ -336,6 +377,7 @@ static const mp_rom_map_elem_t example_module_globals_table[] = {
     { MP_ROM_QSTR(MP_QSTR_isqrt), MP_ROM_PTR(&isqrt_obj) },
     { MP_ROM_QSTR(MP_QSTR_sign), MP_ROM_PTR(&sign_obj) },
     { MP_ROM_QSTR(MP_QSTR_fir_core), MP_ROM_PTR(&fir_core_obj) },
+    { MP_ROM_QSTR(MP_QSTR_fir_sym_core), MP_ROM_PTR(&fir_sym_core_obj) },
     { MP_ROM_QSTR(MP_QSTR_power_meter_core), MP_ROM_PTR(&power_meter_core_obj) },
     /*{ MP_ROM_QSTR(MP_QSTR_tim_cb), MP_ROM_PTR(&tim_cb_obj) },*/
     { MP_ROM_QSTR(MP_QSTR_utoi32), MP_ROM_PTR(&utoi32_obj) },